@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+from src.firecrawl import FirecrawlService, AsyncFirecrawlService
+from src.workflow import Workflow
+from .fakes import FakeFirecrawlApp, FakeAsyncFirecrawlApp, FakeChatModel
+
+# Checks that Workflow.arun throughput grows with the number of queries in flight
+# Every external call is served by a local stand-in with a fixed delay, so the only way to go faster is overlap
+# Run from the advanced-agent directory: python -m benchmarks.concurrency
+
+
+def build_workflow(latency: float) -> Workflow:
+    return Workflow(
+        firecrawl=FirecrawlService(app=FakeFirecrawlApp(latency)),
+        async_firecrawl=AsyncFirecrawlService(app=FakeAsyncFirecrawlApp(latency)),
+        llm=FakeChatModel(latency),
+    )
+
+
+async def measure(workflow: Workflow, in_flight: int, rounds: int) -> float:
+    # Returns queries per second with `in_flight` queries running at once
+    queries = [f"query {i}" for i in range(in_flight * rounds)]
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def one(query: str):
+        async with semaphore:
+            return await workflow.arun(query)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[one(query) for query in queries])
+    elapsed = time.perf_counter() - start
+
+    assert all(result.analysis for result in results), "every query should produce a recommendation"
+    return len(queries) / elapsed
+
+
+async def main(levels, rounds: int, latency: float, min_efficiency: float) -> int:
+    workflow = build_workflow(latency)
+    workflow.warm_up()
+
+    # Silence the workflow's progress prints so only the report is shown
+    throughput = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for in_flight in levels:
+            throughput[in_flight] = await measure(workflow, in_flight, rounds)
+
+    baseline = throughput[levels[0]]
+    failed = False
+    print(f"{'in flight':>10} {'queries/s':>10} {'speedup':>8}")
+    for in_flight in levels:
+        speedup = throughput[in_flight] / baseline
+        print(f"{in_flight:>10} {throughput[in_flight]:>10.2f} {speedup:>8.2f}")
+        # Throughput should scale close to linearly with in-flight queries since all waits overlap
+        expected = (in_flight / levels[0]) * min_efficiency
+        if speedup < expected:
+            print(f"FAIL: expected at least {expected:.2f}x with {in_flight} queries in flight")
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency scaling check for Workflow.arun")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--min-efficiency", type=float, default=0.5)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.levels, args.rounds, args.latency, args.min_efficiency)))
@@ -0,0 +1,196 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+from firecrawl.firecrawl import ScrapeResponse, SearchResponse
+
+# Local stand-ins for FirecrawlApp and the OpenAI chat model
+# They serve canned content after a configurable delay (latency +/- jitter) and can fail a share of calls,
+# so runs are repeatable and need no network or API keys
+
+TOOLS = ["Supabase", "PlanetScale", "Railway", "Appwrite", "Nhost", "Neon", "Convex", "Turso"]
+
+
+def _page(title: str) -> str:
+    return (
+        f"# {title}\n\n"
+        f"{title} is a developer platform with a REST API and SDKs for Python, JavaScript and Go.\n\n"
+        "## Pricing\n\nFree tier available, paid plans start at $25/month.\n\n"
+        "## Integrations\n\nGitHub, Vercel, Docker, AWS.\n"
+    )
+
+
+def _search_data(query: str, limit: int) -> List[dict]:
+    # Article searches return comparison articles, tool searches return the tool's homepage
+    for tool in TOOLS:
+        if query.lower().startswith(tool.lower()):
+            slug = tool.lower()
+            return [{
+                "url": f"https://{slug}.example.com",
+                "markdown": _page(tool),
+                "metadata": {"title": tool},
+            }][:limit]
+    return [
+        {
+            "url": f"https://articles.example.com/{i}",
+            "markdown": "\n".join(_page(tool) for tool in TOOLS[i:i + 3]),
+            "metadata": {"title": f"Article {i}"},
+        }
+        for i in range(limit)
+    ]
+
+
+class FakeError(Exception):
+    """Raised by a stand-in when a call is picked to fail"""
+
+
+class FakeBackend:
+    """Latency, jitter and failure settings shared by the stand-ins, plus a call counter"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        # Each call waits latency +/- up to jitter seconds
+        self.jitter = jitter
+        # Share of calls (0..1) that raise FakeError after waiting
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next(self) -> tuple:
+        # Returns (delay, should_fail) for one call
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+            return delay, fail
+
+    def wait(self, name: str) -> None:
+        delay, fail = self._next()
+        time.sleep(delay)
+        if fail:
+            raise FakeError(f"{type(self).__name__}.{name} failed")
+
+    async def await_(self, name: str) -> None:
+        delay, fail = self._next()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeError(f"{type(self).__name__}.{name} failed")
+
+
+class FakeFirecrawlApp(FakeBackend):
+    """Blocking stand-in for FirecrawlApp"""
+
+    def search(self, query: str, limit: int = 5, scrape_options=None):
+        self.wait("search")
+        return SearchResponse(success=True, data=_search_data(query, limit))
+
+    def scrape_url(self, url: str, formats=None):
+        self.wait("scrape_url")
+        return ScrapeResponse(markdown=_page(url))
+
+
+class FakeAsyncFirecrawlApp(FakeBackend):
+    """Async stand-in for AsyncFirecrawlApp"""
+
+    async def search(self, query: str, limit: int = 5, scrape_options=None):
+        await self.await_("search")
+        # Like the real async SDK, the raw JSON body rather than a SearchResponse
+        return {"success": True, "data": _search_data(query, limit)}
+
+    async def scrape_url(self, url: str, formats=None):
+        await self.await_("scrape_url")
+        return ScrapeResponse(markdown=_page(url))
+
+
+def _reply(messages) -> str:
+    # Pick a canned answer based on which prompt is being asked
+    system = messages[0].content if messages else ""
+    if "Extract specific tool" in system:
+        return "\n".join(TOOLS[:5])
+    return "Supabase is the best fit: generous free tier, Postgres under the hood and first-class SDKs."
+
+
+def _chunks(text: str) -> List[str]:
+    # Streamed chunks are words with their trailing whitespace, newlines included
+    return re.findall(r"\S+\s*", text)
+
+
+class _FakeStructuredModel:
+    def __init__(self, model: "FakeChatModel", schema):
+        self.model = model
+        self.schema = schema
+
+    def invoke(self, messages):
+        self.model.wait("structured_invoke")
+        return self._result()
+
+    async def ainvoke(self, messages):
+        await self.model.await_("structured_invoke")
+        return self._result()
+
+    def _result(self):
+        return self.schema(
+            pricing_model="Freemium",
+            is_open_source=True,
+            tech_stack=["Postgres", "TypeScript"],
+            description="Hosted backend with database, auth and storage APIs.",
+            api_available=True,
+            language_support=["Python", "JavaScript", "Go"],
+            integration_capabilities=["GitHub", "Vercel"],
+        )
+
+
+class FakeChatModel(FakeBackend):
+    """Stand-in for ChatOpenAI covering the calls Workflow makes"""
+
+    def __init__(self, *args, token_latency: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Delay between streamed chunks, so overlapping work with a stream shows up in the timings
+        self.token_latency = token_latency
+
+    def with_structured_output(self, schema):
+        return _FakeStructuredModel(self, schema)
+
+    def invoke(self, messages):
+        self.wait("invoke")
+        reply = _reply(messages)
+        # A full answer takes as long to generate as its stream
+        if self.token_latency:
+            time.sleep(self.token_latency * (len(_chunks(reply)) - 1))
+        return SimpleNamespace(content=reply)
+
+    async def ainvoke(self, messages):
+        await self.await_("ainvoke")
+        reply = _reply(messages)
+        if self.token_latency:
+            await asyncio.sleep(self.token_latency * (len(_chunks(reply)) - 1))
+        return SimpleNamespace(content=reply)
+
+    def stream(self, messages):
+        # The delay stands in for time to first token
+        self.wait("stream")
+        for i, word in enumerate(_chunks(_reply(messages))):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(content=word)
+
+    async def astream(self, messages):
+        await self.await_("astream")
+        for i, word in enumerate(_chunks(_reply(messages))):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield SimpleNamespace(content=word)
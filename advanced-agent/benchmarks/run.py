@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from src.firecrawl import FirecrawlService, AsyncFirecrawlService
+from src.metrics import Metrics
+from src.workflow import Workflow
+from .fakes import FakeFirecrawlApp, FakeAsyncFirecrawlApp, FakeChatModel
+
+# Offline end-to-end benchmark for Workflow.run
+# Firecrawl and OpenAI are replaced by local stand-ins, so numbers only move when the workflow itself changes
+# Run from the advanced-agent directory:
+#   python -m benchmarks.run --queries 40 --concurrency 1 4 8 --json results.json
+#   python -m benchmarks.run --baseline results.json   (exits non-zero on a regression)
+
+STAGES = ("node.extract_tools", "node.research", "node.analyze")
+# With --pipelined extraction and research share one node
+PIPELINED_STAGES = ("node.extract_and_research", "node.analyze")
+
+
+def build_workflow(args, seed: int) -> Workflow:
+    def backend(cls, offset, **kwargs):
+        # Separate seeds per stand-in so failures don't line up across backends
+        return cls(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, seed=seed + offset, **kwargs)
+
+    return Workflow(
+        max_concurrency=args.research_concurrency,
+        firecrawl=FirecrawlService(app=backend(FakeFirecrawlApp, 0)),
+        async_firecrawl=AsyncFirecrawlService(app=backend(FakeAsyncFirecrawlApp, 1)),
+        llm=backend(FakeChatModel, 2, token_latency=args.token_latency),
+        metrics=Metrics(),
+        pipelined=args.pipelined,
+    )
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_level(args, concurrency: int) -> Dict[str, Any]:
+    workflow = build_workflow(args, args.seed)
+    # Imports and graph compilation are one-off startup costs, tracked by benchmarks.startup instead
+    workflow.warm_up()
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+    latencies: List[float] = []
+    stages = PIPELINED_STAGES if args.pipelined else STAGES
+    stage_times: Dict[str, List[float]] = {stage: [] for stage in stages}
+    errors = 0
+
+    def one(query: str):
+        start = time.perf_counter()
+        state = workflow.run(query)
+        return time.perf_counter() - start, state
+
+    # Silence the workflow's progress prints so only the report is shown
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(one, query) for query in queries]
+            for future in futures:
+                try:
+                    latency, state = future.result()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(latency)
+                for span in (state.metrics or {}).get("spans", []):
+                    if span["name"] in stage_times:
+                        stage_times[span["name"]].append(span["duration"])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "queries": len(queries),
+        "errors": errors,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "stages": {
+            stage.split(".", 1)[1]: statistics.fmean(times) if times else 0.0
+            for stage, times in stage_times.items()
+        },
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    stages = list(results[0]["stages"]) if results else []
+    header = f"{'conc':>5} {'qps':>8} {'p50 s':>8} {'p95 s':>8} {'errors':>7}"
+    header += "".join(f" {stage + ' s':>20}" for stage in stages)
+    print(header)
+    for result in results:
+        line = f"{result['concurrency']:>5} {result['qps']:>8.2f} {result['p50']:>8.3f} {result['p95']:>8.3f} {result['errors']:>7}"
+        line += "".join(f" {result['stages'][stage]:>20.3f}" for stage in stages)
+        print(line)
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    # A regression is p95 growing, or throughput shrinking, by more than `tolerance` at the same concurrency
+    previous = {entry["concurrency"]: entry for entry in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["concurrency"])
+        if before is None:
+            continue
+        if result["p95"] > before["p95"] * (1 + tolerance):
+            problems.append(f"concurrency {result['concurrency']}: p95 {before['p95']:.3f}s -> {result['p95']:.3f}s")
+        if result["qps"] < before["qps"] * (1 - tolerance):
+            problems.append(f"concurrency {result['concurrency']}: qps {before['qps']:.2f} -> {result['qps']:.2f}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for Workflow.run")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="Queries in flight")
+    parser.add_argument("--research-concurrency", type=int, default=4, help="Workflow max_concurrency")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per stand-in call")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Random +/- seconds added to each call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--pipelined", action="store_true", help="Benchmark the pipelined workflow")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of stand-in calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline")
+    args = parser.parse_args()
+
+    results = [run_level(args, concurrency) for concurrency in args.concurrency]
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
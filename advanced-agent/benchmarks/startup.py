@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Cold-start benchmark for the CLI
+# Each scenario runs in a fresh interpreter, so every import is paid again just like a real invocation
+# Run from the advanced-agent directory:
+#   python -m benchmarks.startup --json startup.json
+#   python -m benchmarks.startup --baseline startup.json   (exits non-zero on a regression)
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that take seconds to import and must only load once a query needs them
+HEAVY_MODULES = ("langgraph", "langchain_openai", "langchain_core", "firecrawl", "openai")
+
+# name -> (python code, whether heavy modules may be loaded by the end of it)
+SCENARIOS = {
+    "interpreter": ("pass", False),
+    "import main": ("import main", False),
+    "cli --help": ("import sys, main; sys.argv = ['main.py', '--help']\ntry:\n    main.main()\nexcept SystemExit:\n    pass", False),
+    "build workflow": ("import main; main.build_workflow()", False),
+    "warm workflow": ("import main; main.build_workflow().warm_up()", True),
+}
+
+# Appended to every scenario to report which heavy modules ended up loaded
+_REPORT = f"\nimport json as _json, sys as _sys\nprint(_json.dumps([m for m in {HEAVY_MODULES!r} if m in _sys.modules]), file=_sys.stderr)"
+
+
+def run_once(code: str, env: Dict[str, str]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code + _REPORT],
+        cwd=AGENT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"scenario failed:\n{completed.stderr}")
+    loaded = json.loads(completed.stderr.strip().splitlines()[-1])
+    return {"seconds": elapsed, "loaded": loaded}
+
+
+def run_scenarios(repeat: int) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ)
+        # Keys only need to be present, nothing here talks to the APIs
+        env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+        env.setdefault("FIRECRAWL_API_KEY", "startup-benchmark")
+        env["AGENT_CACHE_DIR"] = cache_dir
+
+        results = []
+        for name, (code, heavy_allowed) in SCENARIOS.items():
+            runs = [run_once(code, env) for _ in range(repeat)]
+            seconds = [run["seconds"] for run in runs]
+            results.append({
+                "scenario": name,
+                "median": statistics.median(seconds),
+                "min": min(seconds),
+                "loaded": runs[-1]["loaded"],
+                "heavy_allowed": heavy_allowed,
+            })
+        return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<16} {'median s':>9} {'min s':>8}  heavy modules loaded")
+    for result in results:
+        loaded = ", ".join(result["loaded"]) or "-"
+        print(f"{result['scenario']:<16} {result['median']:>9.3f} {result['min']:>8.3f}  {loaded}")
+
+
+def eager_imports(results: List[Dict[str, Any]]) -> List[str]:
+    return [
+        f"{result['scenario']}: loaded {', '.join(result['loaded'])}"
+        for result in results
+        if result["loaded"] and not result["heavy_allowed"]
+    ]
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float, slack: float) -> List[str]:
+    # A regression is the median growing by more than `tolerance`, plus `slack` seconds to absorb process noise
+    previous = {entry["scenario"]: entry for entry in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if result["median"] > before["median"] * (1 + tolerance) + slack:
+            problems.append(f"{result['scenario']}: {before['median']:.3f}s -> {result['median']:.3f}s")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the advanced-agent CLI")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per scenario")
+    parser.add_argument("--json", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression against the baseline")
+    parser.add_argument("--slack", type=float, default=0.05, help="Allowed absolute regression in seconds")
+    args = parser.parse_args()
+
+    results = run_scenarios(max(1, args.repeat))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # Heavy modules loaded before a query needs them are a regression whatever the timings say
+    problems = eager_imports(results)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems += compare(results, json.load(f), args.tolerance, args.slack)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,72 +1,189 @@
+import argparse
+import contextlib
+import os
+import sys
+import uuid
+import threading
 from dotenv import load_dotenv
-from src.workflow import Workflow
+from src.metrics import Metrics
+# The workflow and its stores are imported when first needed, so --help and the prompt come up right away
 
 load_dotenv()
 
-def main():
-    # Initialize the workflow
-    workflow = Workflow()
+# Directory for on-disk caches, kept between runs so repeated questions skip the network
+CACHE_DIR = os.getenv("AGENT_CACHE_DIR", ".cache")
+
+# Print a single researched company
+def print_company(i, company):
+    print(f"\n{i}. 🏢 {company.name}")
+    print(f"   🌐 Website: {company.website}")
+    print(f"   💰 Pricing: {company.pricing_model}")
+    print(f"   📖 Open Source: {company.is_open_source}")
+
+    if company.tech_stack:
+        print(f"   🛠️  Tech Stack: {', '.join(company.tech_stack[:5])}")
+
+    if company.language_support:
+        print(
+            f"   💻 Language Support: {', '.join(company.language_support[:5])}"
+        )
+
+    if company.api_available is not None:
+        api_status = (
+            "✅ Available" if company.api_available else "❌ Not Available"
+        )
+        print(f"   🔌 API: {api_status}")
+
+    if company.integration_capabilities:
+        print(
+            f"   🔗 Integrations: {', '.join(company.integration_capabilities[:4])}"
+        )
+
+    if company.description and company.description != "Analysis failed":
+        print(f"   📝 Description: {company.description}")
+
+    print()
+
+
+# Requests per second allowed per backend, tune to the plan behind each API key
+FIRECRAWL_RATE_LIMIT = float(os.getenv("FIRECRAWL_RATE_LIMIT", "2"))
+OPENAI_RATE_LIMIT = float(os.getenv("OPENAI_RATE_LIMIT", "5"))
+
+# Initialize the workflow with persistent Firecrawl and analysis caches
+def build_workflow(max_concurrency=4, metrics=None, pipelined=False):
+    from src.workflow import Workflow
+    from src.cache import SQLiteCache
+    from src.knowledge import CompanyKnowledgeBase
+    from src.ratelimit import RateController
+    from src.checkpoint import RunStore
+    from src.blobs import DiskBlobStore
+
+    return Workflow(
+        max_concurrency=max_concurrency,
+        metrics=metrics,
+        pipelined=pipelined,
+        firecrawl_rate=RateController("firecrawl", rate=FIRECRAWL_RATE_LIMIT, burst=5, metrics=metrics),
+        openai_rate=RateController("openai", rate=OPENAI_RATE_LIMIT, burst=10, metrics=metrics),
+        cache=SQLiteCache(os.path.join(CACHE_DIR, "firecrawl.sqlite")),
+        analysis_cache=SQLiteCache(os.path.join(CACHE_DIR, "analysis.sqlite"), ttl=7 * 24 * 3600.0),
+        knowledge_base=CompanyKnowledgeBase(os.path.join(CACHE_DIR, "knowledge.sqlite")),
+        run_store=RunStore(os.path.join(CACHE_DIR, "runs.sqlite")),
+        blob_store=DiskBlobStore(os.path.join(CACHE_DIR, "blobs")),
+    )
+
+
+# Run every query from a JSONL file (or stdin) and write one JSONL result per query
+def batch(args, metrics=None):
+    from src.batch import read_queries, run_batch
+
+    workflow = build_workflow(metrics=metrics, pipelined=args.pipelined)
+    
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    with source:
+        queries = read_queries(source)
+    
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        # Progress messages go to stderr so they never mix with JSONL written to stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            failures = run_batch(workflow, queries, output, concurrency=args.concurrency)
+    finally:
+        workflow.close()
+        if output is not sys.stdout:
+            output.close()
+    
+    print(f"Finished {len(queries)} queries, {failures} failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def interactive(metrics=None, pipelined=False):
+    from src.models import CompanyResearched, RecommendationToken
+
+    workflow = build_workflow(metrics=metrics, pipelined=pipelined)
+    # Load the clients and compile the graph in the background while the user types the first query
+    threading.Thread(target=workflow.warm_up, daemon=True).start()
     
     print("Developer Tools Research Agent")
+    # Run ids of queries that failed part way, asking the same query again resumes the run
+    failed_runs = {}
     
-    while True:
-        # Getting user input for the query
-        query = input("\n🔎 Developer Tools Query: ").strip()
+    try:
+        while True:
+            # Getting user input for the query
+            query = input("\n🔎 Developer Tools Query: ").strip()
         
-        # Check if user input is exit condition for the workflow
-        if query.lower() in ["exit", "quit"]:
-            print("Exiting the workflow. Goodbye!")
-            break
+            # Check if user input is exit condition for the workflow
+            if query.lower() in ["exit", "quit"]:
+                print("Exiting the workflow. Goodbye!")
+                break
         
-        # Run the workflow with the provided query
-        if query:
-            result = workflow.run(query)
-            print(f"\n📊 Results for: {query}")
-            print("=" * 60)
+            # Run the workflow with the provided query, printing results as they arrive
+            if query:
+                print(f"\n📊 Results for: {query}")
+                print("=" * 60)
             
-            # Display the results
-            for i, company in enumerate(result.companies, 1):
-                print(f"\n{i}. 🏢 {company.name}")
-                print(f"   🌐 Website: {company.website}")
-                print(f"   💰 Pricing: {company.pricing_model}")
-                print(f"   📖 Open Source: {company.is_open_source}")
-
-                if company.tech_stack:
-                    print(f"   🛠️  Tech Stack: {', '.join(company.tech_stack[:5])}")
-
-                if company.language_support:
-                    print(
-                        f"   💻 Language Support: {', '.join(company.language_support[:5])}"
-                    )
-
-                if company.api_available is not None:
-                    api_status = (
-                        "✅ Available" if company.api_available else "❌ Not Available"
-                    )
-                    print(f"   🔌 API: {api_status}")
-
-                if company.integration_capabilities:
-                    print(
-                        f"   🔗 Integrations: {', '.join(company.integration_capabilities[:4])}"
-                    )
-
-                if company.description and company.description != "Analysis failed":
-                    print(f"   📝 Description: {company.description}")
-
-                print()
+                shown = 0
+                recommendation_started = False
+                run_id = failed_runs.pop(query, None) or uuid.uuid4().hex
+                try:
+                    for event in workflow.stream(query, run_id=run_id):
+                        # Display each company as soon as its analysis completes
+                        if isinstance(event, CompanyResearched):
+                            shown += 1
+                            print_company(shown, event.company)
+                    
+                        # Display the recommendation as it is generated
+                        elif isinstance(event, RecommendationToken):
+                            if not recommendation_started:
+                                print("Developer Recommendations:")
+                                print("-" * 40)
+                                recommendation_started = True
+                            print(event.text, end="", flush=True)
+                except Exception as e:
+                    failed_runs[query] = run_id
+                    print(f"\n❌ Run failed: {e}\nAsk the same query again to resume from where it stopped.")
+                    continue
             
-            # Display analysis if available
-            if result.analysis:
-                print("Developer Recommendations:")
-                print("-" * 40)
-                print(result.analysis)
-         
-         
-                
-if __name__  == "__main__":
-    main()
-                
-        
-    
+                if recommendation_started:
+                    print()
+    finally:
+        # Background refreshes don't hold up exiting
+        workflow.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Developer Tools Research Agent")
+    parser.add_argument("--batch", metavar="PATH", help="Run queries from a JSONL file ('-' for stdin) instead of prompting")
+    parser.add_argument("--output", metavar="PATH", default="-", help="Where batch results are written as JSONL (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of batch queries run at the same time")
+    parser.add_argument("--refresh-kb", choices=["stale", "all"], help="Re-research companies in the knowledge base and exit")
+    parser.add_argument("--metrics", metavar="PATH", help="Record timings and usage, written on exit as JSON (or Prometheus text for .prom)")
+    parser.add_argument("--pipelined", action="store_true", help="Start researching each tool while the tool list is still being generated")
+    args = parser.parse_args()
     
-    
\ No newline at end of file
+    metrics = Metrics() if args.metrics else None
+    try:
+        if args.refresh_kb:
+            workflow = build_workflow(max_concurrency=args.concurrency, metrics=metrics)
+            refreshed = workflow.refresh_knowledge_base(stale_only=args.refresh_kb == "stale")
+            workflow.close()
+            print(f"Refreshed {refreshed} companies")
+            return 0
+        if args.batch:
+            return batch(args, metrics)
+        interactive(metrics, pipelined=args.pipelined)
+        return 0
+    finally:
+        if metrics is not None:
+            write_metrics(metrics, args.metrics)
+
+
+# Export metrics aggregated over every query of this session
+def write_metrics(metrics, path):
+    content = metrics.to_prometheus() if path.endswith(".prom") else metrics.to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+if __name__  == "__main__":
+    sys.exit(main())
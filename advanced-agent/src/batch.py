@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TextIO
+
+from .knowledge import is_analyzed
+from .models import CompanyInfo
+from .naming import normalize_tool_name
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+
+class ResearchMemo:
+    """Shares tool research between the queries of a batch so each tool is researched once"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # normalized tool name -> fully analyzed CompanyInfo
+        self._results: Dict[str, CompanyInfo] = {}
+        # Queries asking for a tool that is still being researched wait for that research
+        self._flight = SingleFlight(name="research_memo")
+        self._aflight = AsyncSingleFlight(name="research_memo")
+
+    def research(self, tool_name: str, research: Callable[[str], Optional[CompanyInfo]]) -> Optional[CompanyInfo]:
+        key = normalize_tool_name(tool_name)
+        with self._lock:
+            done = key in self._results
+            company = self._results.get(key)
+
+        if not done:
+            # Failures and empty results are not remembered, the next query to ask tries again
+            company = self._flight.do(key, self._research_and_store, key, tool_name, research)
+
+        # Hand every query its own copy so one query's state can't change another's
+        return company.model_copy(deep=True) if company else None
+
+    # Async version of research for queries run with Workflow.arun, sharing the same results
+    async def aresearch(
+        self, tool_name: str, research: Callable[[str], Awaitable[Optional[CompanyInfo]]]
+    ) -> Optional[CompanyInfo]:
+        key = normalize_tool_name(tool_name)
+        with self._lock:
+            company = self._results.get(key)
+
+        if company is None:
+            company = await self._aflight.do(key, self._aresearch_and_store, key, tool_name, research)
+
+        return company.model_copy(deep=True) if company else None
+
+    def _research_and_store(self, key: str, tool_name: str, research) -> Optional[CompanyInfo]:
+        company = research(tool_name)
+        # Stored before the in-flight call finishes, so no later query can miss both
+        self._store(key, company)
+        return company
+
+    async def _aresearch_and_store(self, key: str, tool_name: str, research) -> Optional[CompanyInfo]:
+        company = await research(tool_name)
+        self._store(key, company)
+        return company
+
+    def _store(self, key: str, company: Optional[CompanyInfo]) -> None:
+        if is_analyzed(company):
+            with self._lock:
+                self._results[key] = company
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+def read_queries(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    # Each JSONL line is either {"query": "...", "id": ...} or a bare JSON string
+    queries = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"query": record}
+        if not isinstance(record, dict) or not str(record.get("query", "")).strip():
+            raise ValueError(f"Line {line_number}: expected a JSON string or an object with a 'query' field")
+        record.setdefault("id", line_number)
+        queries.append(record)
+    return queries
+
+
+def batch_run_id(record: Dict[str, Any]) -> str:
+    # Stable per query, so rerunning the same batch after a crash resumes the queries that didn't finish
+    # Finished queries are removed from the run store, so they run again from scratch
+    query_hash = hashlib.sha256(record["query"].encode("utf-8")).hexdigest()[:12]
+    return f"batch:{record['id']}:{query_hash}"
+
+
+def run_batch(workflow, queries: List[Dict[str, Any]], output: TextIO, concurrency: int = 4) -> int:
+    # Runs queries with at most `concurrency` in flight and writes one JSONL record per query as soon as it finishes
+    # Returns the number of queries that failed
+    failures = 0
+    previous_memo = workflow.research_memo
+    # Tools shared between queries in this batch are researched once
+    workflow.research_memo = ResearchMemo()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            # With a run store on the workflow, queries that failed last time resume from their checkpoints
+            futures = {
+                executor.submit(workflow.run, record["query"], run_id=batch_run_id(record)): record
+                for record in queries
+            }
+            for future in as_completed(futures):
+                record = futures[future]
+                result = {"id": record["id"], "query": record["query"]}
+                try:
+                    result["result"] = future.result().model_dump()
+                except Exception as e:
+                    failures += 1
+                    result["error"] = str(e)
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    finally:
+        workflow.research_memo = previous_memo
+    return failures
@@ -0,0 +1,185 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Content-addressed store for page markdown, so graph state only carries a short reference to it
+# A reference is the sha256 of the text: the same page stored twice takes the space once, and
+# consumers load the text only when they actually need it
+
+
+def blob_ref(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore(ABC):
+    """Base class for content-addressed text stores with a size bound"""
+
+    # Cheap enough to call from an event loop, async callers only move other stores to a worker thread
+    in_memory = False
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def put(self, text: Optional[str]) -> Optional[str]:
+        # Returns the reference for the text, None for empty text so "no content" stays falsy
+        if not text:
+            return None
+        data = text.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._put(ref, data)
+        return ref
+
+    def get(self, ref: Optional[str]) -> Optional[str]:
+        # None when there is no reference or the blob has been evicted since
+        if not ref:
+            return None
+        with self._lock:
+            data = self._get(ref)
+        return data.decode("utf-8") if data is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"blobs": self._count(), "bytes": self._size()}
+
+    # Backends implement these, they are called with the lock held unless the backend says otherwise
+    @abstractmethod
+    def _put(self, ref: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _get(self, ref: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _count(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryBlobStore(BlobStore):
+    """In-process store, least recently used blobs are evicted once max_bytes is reached"""
+
+    in_memory = True
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+
+    def _put(self, ref: str, data: bytes) -> None:
+        if ref not in self._blobs:
+            self._blobs[ref] = data
+            self._bytes += len(data)
+        self._blobs.move_to_end(ref)
+        # The newest blob is kept even when it alone is over the limit
+        while self._bytes > self.max_bytes and len(self._blobs) > 1:
+            _, evicted = self._blobs.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _get(self, ref: str) -> Optional[bytes]:
+        data = self._blobs.get(ref)
+        if data is not None:
+            self._blobs.move_to_end(ref)
+        return data
+
+    def _count(self) -> int:
+        return len(self._blobs)
+
+    def _size(self) -> int:
+        return self._bytes
+
+
+class DiskBlobStore(BlobStore):
+    """One file per blob under `directory`, read through mmap, oldest blobs removed once max_bytes is reached"""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Size on disk, counted on the first write instead of walking the directory every time the CLI starts
+        self._bytes: Optional[int] = None
+
+    # Blobs are written atomically and never changed, so reads skip the store lock and don't wait on writes
+    # A blob evicted while it is being read stays readable through the open file
+    def get(self, ref: Optional[str]) -> Optional[str]:
+        if not ref:
+            return None
+        data = self._get(ref)
+        return data.decode("utf-8") if data is not None else None
+
+    def _path(self, ref: str) -> str:
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.directory, ref[:2], ref)
+
+    def _files(self):
+        # (path, mtime, size) of every stored blob
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _put(self, ref: str, data: bytes) -> None:
+        path = self._path(ref)
+        if os.path.exists(path):
+            return
+        # Counted before writing, so the new blob isn't counted twice
+        size = self._size()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._bytes = size + len(data)
+        if self._bytes > self.max_bytes:
+            self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        # Oldest first, down to 90% of the limit so eviction doesn't run on every put
+        target = self.max_bytes * 0.9
+        for path, _, size in sorted(self._files(), key=lambda entry: entry[1]):
+            if self._bytes <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._bytes -= size
+
+    def _get(self, ref: str) -> Optional[bytes]:
+        try:
+            with open(self._path(ref), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _count(self) -> int:
+        return sum(1 for _ in self._files())
+
+    def _size(self) -> int:
+        if self._bytes is None:
+            self._bytes = sum(size for _, _, size in self._files())
+        return self._bytes
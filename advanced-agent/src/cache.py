@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from pydantic_core import to_jsonable_python
+
+# Caches sit in front of slow network calls (Firecrawl, LLM) so repeated lookups can skip the round trip
+# Every backend supports a TTL per entry, size-based eviction and hit/miss counters
+
+
+def normalize_url(url: str) -> str:
+    # Treat "HTTPS://Supabase.com/" and "https://supabase.com" as the same page
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    netloc = parts.netloc.lower()
+    path = parts.path.rstrip("/")
+    # Fragments never change what the server returns, so drop them
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def search_key(query: str, limit: int) -> str:
+    # Collapse whitespace and casing so equivalent queries share an entry
+    return f"search:{' '.join(query.lower().split())}:{limit}"
+
+
+def scrape_key(url: str) -> str:
+    return f"scrape:{normalize_url(url)}"
+
+
+class Cache(ABC):
+    """Base class for TTL-bounded caches with hit/miss counters"""
+
+    # Cheap enough to call from an event loop, async callers only move other caches to a worker thread
+    in_memory = False
+
+    def __init__(self, ttl: Optional[float] = 3600.0, max_entries: int = 1024):
+        # ttl is in seconds, None keeps entries until they are evicted for space
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        # Returns None on a miss, so None itself is never stored
+        with self._lock:
+            value = self._get(key, time.time())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._set(key, value, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    # Backends implement these, they are always called with the lock held
+    @abstractmethod
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache, the least recently used entry is evicted once max_entries is reached"""
+
+    in_memory = True
+
+    def __init__(self, ttl: Optional[float] = 3600.0, max_entries: int = 1024):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return None
+        # Mark as most recently used
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    """On-disk cache backed by a single SQLite file, survives restarts and can be shared between processes
+
+    Values are stored as JSON, never pickled, so a tampered file can't run code: pydantic models (e.g. Firecrawl
+    responses) come back as plain dicts and callers rebuild the model they expect
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = 24 * 3600.0,
+        max_entries: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # One connection shared by all threads, access is serialized by the base class lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        blob, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        try:
+            value = json.loads(blob)
+        except Exception:
+            # Entry written by an incompatible version, treat it as a miss
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return value
+
+    def _set(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        blob = json.dumps(to_jsonable_python(value))
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), expires_at, now),
+        )
+        self._evict(now)
+        self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Expired entries go first, then least recently used until both size limits hold
+        self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+
+    def _clear(self) -> None:
+        self._conn.execute("DELETE FROM cache")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic_core import to_jsonable_python
+
+from .models import CompanyInfo
+from .naming import normalize_tool_name
+
+# Checkpoints of workflow runs, so a run that failed or was killed can be resumed with its run_id
+# - the state update returned by each graph node is saved once the node finishes
+# - inside research, each tool's result is saved as soon as it is done
+# On resume, finished nodes are replayed from the store and only the missing work calls the APIs again
+# A run that completes is deleted, so only failed or interrupted runs can be resumed
+
+# Run the current node belongs to, read by the per-tool checkpoints in worker threads and tasks
+current_run: ContextVar[Optional[str]] = ContextVar("current_run", default=None)
+
+
+class RunStore:
+    """SQLite store of per-node and per-tool checkpoints, keyed by run id"""
+
+    def __init__(self, path: str, max_age: float = 7 * 24 * 3600.0):
+        self.path = path
+        # Runs started more than max_age seconds ago are dropped when the store is opened, resuming doesn't extend it
+        self.max_age = max_age
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                started_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS run_nodes (
+                run_id TEXT NOT NULL,
+                node TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (run_id, node)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS run_tools (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT,
+                PRIMARY KEY (run_id, key)
+            )"""
+        )
+        self._conn.commit()
+        self.prune()
+
+    def start(self, run_id: str, query: str) -> bool:
+        # Registers the run, returns True when it already existed and is being resumed
+        with self._lock:
+            row = self._conn.execute("SELECT query FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is not None and row[0] != query:
+                raise ValueError(f"Run {run_id} was started for a different query: {row[0]!r}")
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO runs (run_id, query, started_at) VALUES (?, ?, ?)", (run_id, query, time.time())
+                )
+                self._conn.commit()
+        return row is not None
+
+    def node_output(self, run_id: str, node: str) -> Optional[Dict[str, Any]]:
+        # State update saved for a finished node, as plain JSON data
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM run_nodes WHERE run_id = ? AND node = ?", (run_id, node)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_node(self, run_id: str, node: str, update: Dict[str, Any]) -> None:
+        data = json.dumps(to_jsonable_python(update))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_nodes (run_id, node, data) VALUES (?, ?, ?)", (run_id, node, data)
+            )
+            self._conn.commit()
+
+    def saved_tool(self, run_id: str, tool_name: str) -> Tuple[bool, Optional[CompanyInfo]]:
+        # (found, company), a tool that was researched but turned up nothing is found with company None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM run_tools WHERE run_id = ? AND key = ?", (run_id, normalize_tool_name(tool_name))
+            ).fetchone()
+        if row is None:
+            return False, None
+        if row[0] is None:
+            return True, None
+        try:
+            return True, CompanyInfo.model_validate_json(row[0])
+        except Exception:
+            # Written by an incompatible version of CompanyInfo, research it again
+            return False, None
+
+    def save_tool(self, run_id: str, tool_name: str, company: Optional[CompanyInfo]) -> None:
+        data = company.model_dump_json() if company else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_tools (run_id, key, data) VALUES (?, ?, ?)",
+                (run_id, normalize_tool_name(tool_name), data),
+            )
+            self._conn.commit()
+
+    # Called once a run completes, its checkpoints are only needed to resume a failed run
+    def delete(self, run_id: str) -> None:
+        with self._lock:
+            self._delete(run_id)
+            self._conn.commit()
+
+    def prune(self) -> int:
+        # Drops runs older than max_age, returns how many were removed
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id FROM runs WHERE started_at <= ?", (time.time() - self.max_age,)
+            ).fetchall()
+            for (run_id,) in rows:
+                self._delete(run_id)
+            self._conn.commit()
+        return len(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def _delete(self, run_id: str) -> None:
+        for table in ("runs", "run_nodes", "run_tools"):
+            self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
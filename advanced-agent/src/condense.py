@@ -0,0 +1,179 @@
+import math
+import re
+from collections import Counter
+from typing import Iterable, List
+
+# Turns a scraped page into a short, relevant excerpt for the LLM
+# 1. strip markdown boilerplate (images, navigation, link farms, footers)
+# 2. split the page into sections and rank them with BM25 against the fields we want to extract
+# 3. pack the best sections into a token budget, keeping them in page order
+
+# Terms behind the CompanyAnalysis fields, used to rank sections for tool analysis
+ANALYSIS_TERMS = (
+    "pricing price prices plan plans free freemium tier trial paid month monthly year enterprise cost "
+    "open source opensource github license mit apache self-host self-hosted "
+    "api apis rest graphql sdk sdks client library cli webhook endpoint "
+    "language languages python javascript typescript node go golang java rust ruby php kotlin swift dotnet "
+    "integration integrations integrate plugin extension docker kubernetes aws gcp azure vercel vscode "
+    "framework frameworks database postgres mysql developer developers docs documentation"
+)
+
+# Rough characters per token for English markdown, avoids pulling in a tokenizer
+CHARS_PER_TOKEN = 4
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_BARE_URL = re.compile(r"https?://\S+")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_HEADING = re.compile(r"^#{1,6}\s")
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+_FOOTER = re.compile(
+    r"(©|\(c\)\s*\d{4}|copyright|all rights reserved|privacy policy|terms of (service|use))",
+    re.IGNORECASE,
+)
+# Account and cookie prompts, only chrome when the line says nothing else
+_CHROME = re.compile(
+    r"(cookies?( settings| policy| preferences)?|accept( all)?|sign up|log ?in|sign in|"
+    r"subscribe to our newsletter|skip to (main )?content)",
+    re.IGNORECASE,
+)
+# Words a chrome line may carry besides the prompt itself, as in "Sign up free" or "Log in with GitHub"
+MAX_CHROME_EXTRA_WORDS = 2
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _is_chrome(line: str) -> bool:
+    # "Sign up" or "Accept all cookies" alone, but not "Sign up free - includes 500 MB storage"
+    text = _LINK.sub(r"\1", _IMAGE.sub("", line))
+    if not _CHROME.search(text):
+        return False
+    return len(tokenize(_CHROME.sub(" ", text))) <= MAX_CHROME_EXTRA_WORDS
+
+
+def strip_boilerplate(markdown: str) -> str:
+    lines = []
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            lines.append("")
+            continue
+
+        # Table rows are kept whole, a pricing row is often a linked plan name and a price
+        is_table_row = stripped.startswith("|")
+
+        # Lines that are mostly links are menus, breadcrumbs or link farms
+        links = _LINK.findall(stripped)
+        without_links = _LINK.sub("", _IMAGE.sub("", stripped))
+        if not is_table_row and links and len(re.sub(r"[\s|*•·\-–>/]+", "", without_links)) < 12:
+            continue
+
+        # Footer, legal and account chrome
+        if not is_table_row and len(stripped) < 120 and (_FOOTER.search(stripped) or _is_chrome(stripped)):
+            continue
+
+        # Keep link text, drop images, urls and html
+        text = _IMAGE.sub("", stripped)
+        text = _LINK.sub(r"\1", text)
+        text = _BARE_URL.sub("", text)
+        text = _HTML_TAG.sub("", text).strip()
+        # Bullets left empty after removing their link or image
+        if not text or re.fullmatch(r"[-*+•|>\s]*", text):
+            continue
+        lines.append(text)
+
+    # Collapse runs of blank lines
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def split_sections(markdown: str, max_chars: int = 1200) -> List[str]:
+    # A section is a heading plus the text up to the next heading, long sections are split by paragraph
+    sections: List[str] = []
+    current: List[str] = []
+    for line in markdown.splitlines():
+        if _HEADING.match(line) and current:
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip())
+
+    pieces: List[str] = []
+    for section in sections:
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        chunk = ""
+        for paragraph in section.split("\n\n"):
+            if chunk and len(chunk) + len(paragraph) > max_chars:
+                pieces.append(chunk.strip())
+                chunk = ""
+            chunk += paragraph[:max_chars] + "\n\n"
+        if chunk.strip():
+            pieces.append(chunk.strip())
+    return pieces
+
+
+def bm25_scores(documents: List[str], query_terms: Iterable[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    tokenized = [tokenize(document) for document in documents]
+    if not tokenized:
+        return []
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    # Document frequency of each term
+    frequency = Counter(term for tokens in tokenized for term in set(tokens))
+    terms = set(query_terms)
+    total = len(tokenized)
+
+    scores = []
+    for tokens in tokenized:
+        counts = Counter(tokens)
+        length_norm = k1 * (1 - b + b * len(tokens) / average_length)
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (total - frequency[term] + 0.5) / (frequency[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def condense(markdown: str, query: str, token_budget: int) -> str:
+    # Most relevant sections of `markdown` for `query`, in page order, within roughly `token_budget` tokens
+    if not markdown:
+        return ""
+    cleaned = strip_boilerplate(markdown)
+    if estimate_tokens(cleaned) <= token_budget:
+        return cleaned
+
+    sections = split_sections(cleaned)
+    scores = bm25_scores(sections, tokenize(query))
+    # The opening section usually says what the product is, give it a head start
+    if scores:
+        scores[0] += max(scores) * 0.5 + 1.0
+
+    budget = token_budget * CHARS_PER_TOKEN
+    chosen = set()
+    used = 0
+    for index in sorted(range(len(sections)), key=lambda i: scores[i], reverse=True):
+        if scores[index] <= 0 and chosen:
+            break
+        size = len(sections[index]) + 2
+        if used + size > budget:
+            continue
+        chosen.add(index)
+        used += size
+
+    # Nothing fit (a single huge section), fall back to its start
+    if not chosen:
+        return cleaned[:budget]
+    return "\n\n".join(sections[i] for i in sorted(chosen))
@@ -1,47 +1,312 @@
+import asyncio
 import os
-from firecrawl import FirecrawlApp, ScrapeOptions
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
 from dotenv import load_dotenv
+from .cache import Cache, search_key, scrape_key
+from .metrics import Metrics, NULL_METRICS, payload_size
+from .ratelimit import RateController
 
 load_dotenv()
 
-class FirecrawlService:
+
+def _scrape_options():
+    # firecrawl is imported on the first request rather than with this module
+    from firecrawl import ScrapeOptions
+
+    # Format the results in markdown for better readability
+    return ScrapeOptions(formats=["markdown"])
+
+
+def _search_response(result):
+    # The sync SDK returns a SearchResponse, the async SDK (firecrawl-py 2.15) the raw JSON body of the same call,
+    # and SQLiteCache hands back either one as plain JSON
+    # Both services hand out a SearchResponse so callers can read .data, None for a body that reports a failure
+    if not isinstance(result, dict):
+        return result
+    if not result.get("success") or "data" not in result:
+        return None
+    from firecrawl.firecrawl import SearchResponse
+
+    return SearchResponse(**result)
+
+
+def _scrape_response(result):
+    # Cached scrapes can come back as plain JSON (see SQLiteCache), rebuilt into the SDK's ScrapeResponse
+    if not isinstance(result, dict):
+        return result
+    from firecrawl.firecrawl import ScrapeResponse
+
+    return ScrapeResponse(**result)
+
+
+def _checked_search(result):
+    # Like the sync SDK, a failed search raises instead of being returned (and cached)
+    response = _search_response(result)
+    if response is None:
+        raise Exception(f"Search failed. Error: {result.get('error', result)}")
+    return response
+
+
+def _pooled_async_app(api_key: str):
+    # firecrawl-py's AsyncFirecrawlApp opens a new aiohttp session, and so new connections, for every request
+    # This subclass sends its requests through one long-lived session per event loop so connections are reused
+    import aiohttp
+    from firecrawl import AsyncFirecrawlApp
+
+    class PooledAsyncFirecrawlApp(AsyncFirecrawlApp):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # A session belongs to the loop it was created on, e.g. one per asyncio.run
+            self._sessions = {}
+
+        def _session(self) -> "aiohttp.ClientSession":
+            loop = asyncio.get_running_loop()
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                # Sessions of loops that have finished can't be used or closed any more
+                for old in [old for old in self._sessions if old.is_closed()]:
+                    del self._sessions[old]
+                session = aiohttp.ClientSession()
+                self._sessions[loop] = session
+            return session
+
+        # The SDK's _async_request on the shared session
+        # Error responses are raised right away with their status and headers, so RateController can classify
+        # them and honour Retry-After, the SDK's own error only carries a message and is retried blindly
+        async def _async_request(self, method, url, headers, data=None, retries=3, backoff_factor=0.5):
+            session = self._session()
+            for attempt in range(retries):
+                try:
+                    async with session.request(method=method, url=url, headers=headers, json=data) as response:
+                        if response.status == 502:
+                            await asyncio.sleep(backoff_factor * (2 ** attempt))
+                            continue
+                        if response.status < 300:
+                            return await response.json()
+                        error = await self._response_error(response, method)
+                except aiohttp.ClientError:
+                    if attempt == retries - 1:
+                        raise
+                    await asyncio.sleep(backoff_factor * (2 ** attempt))
+                    continue
+                raise error
+            raise Exception("Max retries exceeded")
+
+        async def _response_error(self, response, method: str) -> aiohttp.ClientError:
+            try:
+                await self._handle_error(response, f"make {method} request")
+            except aiohttp.ClientError as e:
+                e.status_code = response.status
+                e.headers = response.headers
+                return e
+            return aiohttp.ClientError(f"Unexpected status code: {response.status}")
+
+        async def aclose(self) -> None:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+            if session is not None:
+                await session.close()
+
+    return PooledAsyncFirecrawlApp(api_key=api_key)
+
+
+def _api_key() -> str:
+    # Get the API key from environment variables
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    # If the API key is not loaded properly, raise an error
+    if not api_key:
+        raise ValueError("FIRECRAWL_API_KEY environment variable is not set.")
+    return api_key
+
+
+class _CachedService(ABC):
+    # Cache and metrics plumbing shared by FirecrawlService and AsyncFirecrawlService
+    def __init__(
+        self,
+        app,
+        cache: Optional[Cache] = None,
+        metrics: Optional[Metrics] = None,
+        rate: Optional[RateController] = None,
+    ):
+        # Firecrawl application used for every request, built on first use when not passed in
+        self._app = app
+        self._app_lock = threading.Lock()
+        # Optional cache for search and scrape responses, a hit skips the API call entirely
+        self.cache = cache
+        # Spans for every call, disabled unless a Metrics instance is passed in
+        self.metrics = metrics or NULL_METRICS
+        # Rate limit, adaptive concurrency and retries on throttling, share one controller per API key
+        self.rate = rate or RateController("firecrawl", metrics=self.metrics)
+
+    @property
+    def app(self):
+        if self._app is None:
+            with self._app_lock:
+                if self._app is None:
+                    self._app = self._new_app()
+        return self._app
+
+    @abstractmethod
+    def _new_app(self):
+        raise NotImplementedError
+
+    # Build the app and import firecrawl ahead of the first request
+    def warm_up(self) -> None:
+        self.app
+        _scrape_options()
+
+    def _from_cache(self, key: str, span):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        hit = cached is not None
+        span.set(cache="hit" if hit else "miss")
+        self.metrics.count("cache.hit" if hit else "cache.miss")
+        if hit:
+            span.set(payload_chars=payload_size(cached))
+        return cached
+
+    def _to_cache(self, key: str, result, span) -> None:
+        span.set(payload_chars=payload_size(result))
+        if self.cache is not None:
+            self.cache.set(key, result)
+
+
+class FirecrawlService(_CachedService):
     # Constructor to initialize class, as soon as class instance is created run set-up steps
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[Cache] = None,
+        app=None,
+        metrics: Optional[Metrics] = None,
+        rate: Optional[RateController] = None,
+    ):
         
-        # Get the API key from environment variables
-        api_key = os.getenv("FIRECRAWL_API_KEY")
-        # If the API key is not loaded properly, raise an error
-        if not api_key:
-            raise ValueError("FIRECRAWL_API_KEY environment variable is not set.")
+        # An already built app (or a stand-in with the same methods) can be passed in directly
+        # Otherwise the key is checked now and the app is built on the first request
+        if app is None:
+            self._api_key = _api_key()
         
-        # Initialize the Firecrawl application with the API key
-        self.app = FirecrawlApp(api_key=api_key)
+        super().__init__(app, cache=cache, metrics=metrics, rate=rate)
+
+    def _new_app(self):
+        from firecrawl import FirecrawlApp
+
+        return FirecrawlApp(api_key=self._api_key)
         
     # Search for companies using the Firecrawl app
     def search_companies(self, query: str, num_results: int = 5):
         # Need query and only want 5 results
-        try:
-            result = self.app.search(
-                query=f"{query} company pricing", # Searches company name/query and pricing
-                limit=num_results, # Limit the number of results
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"] # Format the results in markdown for better readability
-                )
-            )
-            return result
-        except Exception as e:
-            print(f"Error during search: {e}")
-            return []
+        key = search_key(query, num_results)
+        with self.metrics.span("firecrawl.search", query=query) as span:
+            cached = self._from_cache(key, span)
+            if cached is not None:
+                return _search_response(cached)
+            try:
+                # Throttled and transient failures are retried with backoff before giving up
+                result = _checked_search(self.rate.call(
+                    self.app.search,
+                    query=f"{query} company pricing", # Searches company name/query and pricing
+                    limit=num_results, # Limit the number of results
+                    scrape_options=_scrape_options()
+                ))
+                self._to_cache(key, result, span)
+                return result
+            except Exception as e:
+                print(f"Error during search: {e}")
+                span.set(error=str(e))
+                return []
         
     # Scrape company pages using the Firecrawl app
     def scrape_company_pages(self, url: str):
         # Given a url for a site to scrape
-        try:
-            result = self.app.scrape_url(
-                url, # URL to scrape
-                formats=["markdown"], # Format the results in markdown
-            )
-            return result
-        except Exception as e:
-            print(f"Error during scraping: {e}")
-            return None
\ No newline at end of file
+        key = scrape_key(url)
+        with self.metrics.span("firecrawl.scrape", url=url) as span:
+            cached = self._from_cache(key, span)
+            if cached is not None:
+                return _scrape_response(cached)
+            try:
+                result = self.rate.call(
+                    self.app.scrape_url,
+                    url, # URL to scrape
+                    formats=["markdown"], # Format the results in markdown
+                )
+                self._to_cache(key, result, span)
+                return result
+            except Exception as e:
+                print(f"Error during scraping: {e}")
+                span.set(error=str(e))
+                return None
+
+
+class AsyncFirecrawlService(_CachedService):
+    # Async twin of FirecrawlService, lets one event loop keep many Firecrawl requests in flight
+    # Uses the same cache keys as FirecrawlService, so both services can share one cache
+    def __init__(
+        self,
+        cache: Optional[Cache] = None,
+        app=None,
+        metrics: Optional[Metrics] = None,
+        rate: Optional[RateController] = None,
+    ):
+        if app is None:
+            self._api_key = _api_key()
+        
+        super().__init__(app, cache=cache, metrics=metrics, rate=rate)
+
+    def _new_app(self):
+        return _pooled_async_app(self._api_key)
+
+    # Close the pooled HTTP session of the running event loop, call before a loop you manage shuts down
+    async def aclose(self) -> None:
+        close = getattr(self._app, "aclose", None)
+        if close is not None:
+            await close()
+
+    # The cache can be SQLite, its reads and writes then run in a worker thread to keep the event loop free
+    async def _afrom_cache(self, key: str, span):
+        if self.cache is None or self.cache.in_memory:
+            return self._from_cache(key, span)
+        return await asyncio.to_thread(self._from_cache, key, span)
+
+    async def _ato_cache(self, key: str, result, span) -> None:
+        if self.cache is None or self.cache.in_memory:
+            self._to_cache(key, result, span)
+        else:
+            await asyncio.to_thread(self._to_cache, key, result, span)
+        
+    async def search_companies(self, query: str, num_results: int = 5):
+        key = search_key(query, num_results)
+        with self.metrics.span("firecrawl.search", query=query) as span:
+            cached = await self._afrom_cache(key, span)
+            if cached is not None:
+                return _search_response(cached)
+            try:
+                result = _checked_search(await self.rate.acall(
+                    self.app.search,
+                    query=f"{query} company pricing",
+                    limit=num_results,
+                    scrape_options=_scrape_options()
+                ))
+                await self._ato_cache(key, result, span)
+                return result
+            except Exception as e:
+                print(f"Error during search: {e}")
+                span.set(error=str(e))
+                return []
+        
+    async def scrape_company_pages(self, url: str):
+        key = scrape_key(url)
+        with self.metrics.span("firecrawl.scrape", url=url) as span:
+            cached = await self._afrom_cache(key, span)
+            if cached is not None:
+                return _scrape_response(cached)
+            try:
+                result = await self.rate.acall(self.app.scrape_url, url, formats=["markdown"])
+                await self._ato_cache(key, result, span)
+                return result
+            except Exception as e:
+                print(f"Error during scraping: {e}")
+                span.set(error=str(e))
+                return None
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from .models import CompanyInfo
+from .naming import normalize_tool_name
+
+
+def is_analyzed(company: Optional[CompanyInfo]) -> bool:
+    # Only fully analyzed companies are worth keeping, a failed analysis has no pricing or the "Failed" placeholder
+    return company is not None and bool(company.pricing_model) and company.description != "Failed"
+
+
+class KnowledgeRecord(NamedTuple):
+    company: CompanyInfo
+    refreshed_at: float
+    fresh: bool
+
+
+class CompanyKnowledgeBase:
+    """Persistent store of researched companies, keyed by normalized tool name"""
+
+    def __init__(self, path: str, max_age: float = 7 * 24 * 3600.0):
+        self.path = path
+        # Records older than max_age seconds are stale and get re-researched
+        self.max_age = max_age
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS companies (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                website TEXT NOT NULL,
+                data TEXT NOT NULL,
+                refreshed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, tool_name: str) -> Optional[KnowledgeRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, refreshed_at FROM companies WHERE key = ?", (normalize_tool_name(tool_name),)
+            ).fetchone()
+        if row is None:
+            return None
+        data, refreshed_at = row
+        try:
+            company = CompanyInfo.model_validate_json(data)
+        except Exception:
+            # Written by an incompatible version of CompanyInfo, research it again
+            return None
+        return KnowledgeRecord(company, refreshed_at, time.time() - refreshed_at < self.max_age)
+
+    def put(self, company: CompanyInfo) -> bool:
+        # Returns whether the record was stored
+        if not is_analyzed(company):
+            return False
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO companies (key, name, website, data, refreshed_at) VALUES (?, ?, ?, ?, ?)",
+                (normalize_tool_name(company.name), company.name, company.website, company.model_dump_json(), time.time()),
+            )
+            self._conn.commit()
+        return True
+
+    def names(self, stale_only: bool = False) -> List[str]:
+        # Tool names in the store, oldest first
+        query = "SELECT name FROM companies"
+        params: tuple = ()
+        if stale_only:
+            query += " WHERE refreshed_at <= ?"
+            params = (time.time() - self.max_age,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY refreshed_at ASC", params).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, tool_name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM companies WHERE key = ?", (normalize_tool_name(tool_name),))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
@@ -0,0 +1,261 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Timing spans and counters for graph nodes and external calls
+# Each run gets a RunTrace (attached to ResearchState.metrics), and every span also feeds a latency
+# histogram that is aggregated across runs and can be exported as JSON or Prometheus text
+# A disabled Metrics hands out one shared no-op span, so instrumented code costs next to nothing
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Trace of the run currently executing and the innermost open span, carried across threads with copy_context
+_current_trace: contextvars.ContextVar[Optional["RunTrace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class RunTrace:
+    """Spans and counters recorded while a single query runs"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration": self.duration,
+                # Spans are recorded when they end, sort them back into start order
+                "spans": sorted(self.spans, key=lambda span: span["start"]),
+                "counters": dict(self.counters),
+            }
+
+
+class Span:
+    """A timed operation, extra attributes (payload size, cache hit, tokens...) can be attached with set()"""
+
+    __slots__ = ("metrics", "name", "attrs", "start", "_started", "_token")
+
+    def __init__(self, metrics: "Metrics", name: str, attrs: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self._started = 0.0
+        self._token = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, name: str, value: float) -> None:
+        self.attrs[name] = self.attrs.get(name, 0) + value
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.metrics._finish(self, duration)
+        # Never swallow the exception
+        return False
+
+
+class _NullSpan:
+    """Stand-in span used when metrics are disabled"""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def add(self, name: str, value: float) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf bucket, counts are not cumulative here
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Estimated from bucket upper bounds, good enough to spot regressions
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(list(self.buckets) + [float("inf")], self.counts):
+            cumulative += bucket_count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    """Collects spans and counters, per run and aggregated over every run"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[str, _Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self) -> Iterator[Optional[RunTrace]]:
+        # Everything recorded inside this block (and in threads started with copy_context) lands in the trace
+        if not self.enabled:
+            yield None
+            return
+        trace = RunTrace()
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            trace.finish()
+            _current_trace.reset(token)
+            self._observe("run", trace.duration)
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.count(name, value)
+
+    def record_tokens(self, prompt_tokens: int, completion_tokens: int) -> None:
+        # Token usage is added to the innermost open span and to the counters
+        if not self.enabled:
+            return
+        span = _current_span.get()
+        if span is not None:
+            span.add("prompt_tokens", prompt_tokens)
+            span.add("completion_tokens", completion_tokens)
+        self.count("llm.prompt_tokens", prompt_tokens)
+        self.count("llm.completion_tokens", completion_tokens)
+
+    def _observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def _finish(self, span: Span, duration: float) -> None:
+        self._observe(span.name, duration)
+        self.count(f"{span.name}.calls")
+        if "error" in span.attrs:
+            self.count(f"{span.name}.errors")
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span({"name": span.name, "start": span.start, "duration": duration, **span.attrs})
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "histograms": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+                "counters": dict(self._counters),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "agent") -> str:
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of workflow runs, graph nodes and external calls",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            for bound, cumulative in histogram["buckets"].items():
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {histogram["sum"]}')
+            lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {histogram["count"]}')
+        lines.append(f"# HELP {prefix}_events_total Calls, errors, cache hits and token counts")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Shared disabled instance, the default wherever metrics are optional
+NULL_METRICS = Metrics(enabled=False)
+
+
+def payload_size(result: Any) -> int:
+    # Characters of markdown in a Firecrawl search or scrape response
+    if result is None:
+        return 0
+    data = getattr(result, "data", None)
+    if data is not None:
+        return sum(len(item.get("markdown") or "") for item in data)
+    return len(getattr(result, "markdown", None) or "")
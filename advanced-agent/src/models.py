@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal, Union
 # Allows easy data validation, set type of data we want
 from pydantic import BaseModel
 
@@ -30,11 +30,44 @@ class CompanyInfo(BaseModel):
     language_support: List[str] = []
     integration_capabilities: List[str] = []
     developer_experience_rating: Optional[str] = None  # Poor, Good, Excellent
+    content_ref: Optional[str] = None  # Blob store reference to the page's markdown, loaded with Workflow.content
 
 
 class ResearchState(BaseModel):
     query: str
+    run_id: Optional[str] = None  # Identifies a checkpointed run so it can be resumed
     extracted_tools: List[str] = []  # Tools extracted from articles
     companies: List[CompanyInfo] = []
-    search_results: List[Dict[str, Any]] = []
-    analysis: Optional[str] = None
\ No newline at end of file
+    search_results: List[Dict[str, Any]] = []  # Articles found for the query: url, title and content_ref
+    analysis: Optional[str] = None
+    metrics: Optional[Dict[str, Any]] = None  # Timing spans and counters for this run, when instrumentation is on
+
+
+# Events yielded by Workflow.stream while a query is running, in the order they are produced
+
+class ToolsExtracted(BaseModel):
+    """Tool names pulled out of the articles, emitted before research starts"""
+    type: Literal["tools_extracted"] = "tools_extracted"
+    tools: List[str] = []
+
+
+class CompanyResearched(BaseModel):
+    """A single tool finished research and analysis"""
+    type: Literal["company_researched"] = "company_researched"
+    index: int  # Position of the tool in the research order
+    company: CompanyInfo
+
+
+class RecommendationToken(BaseModel):
+    """A chunk of the recommendation text as the LLM streams it"""
+    type: Literal["recommendation_token"] = "recommendation_token"
+    text: str
+
+
+class RunCompleted(BaseModel):
+    """Final event carrying the complete state, same as Workflow.run would return"""
+    type: Literal["run_completed"] = "run_completed"
+    state: ResearchState
+
+
+WorkflowEvent = Union[ToolsExtracted, CompanyResearched, RecommendationToken, RunCompleted]
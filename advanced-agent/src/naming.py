@@ -0,0 +1,11 @@
+import re
+
+# Tool names come from LLM output and page titles, so the same tool shows up in many spellings
+
+
+def normalize_tool_name(name: str) -> str:
+    # "  Supabase ", "supabase" and "SUPABASE" all map to "supabase"
+    name = name.strip().lower()
+    # Collapse punctuation and repeated whitespace into single spaces
+    name = re.sub(r"[^\w.+#]+", " ", name)
+    return " ".join(name.split())
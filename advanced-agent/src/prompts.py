@@ -1,3 +1,5 @@
+import hashlib
+
 # Variable assigned prompts are standard prompts that don't change
 # Methdod assigned prompts are dynamic and can change based on user input through the method parameters
 
@@ -5,6 +7,9 @@ class DeveloperToolsPrompts:
     """Collection of prompts for analyzing developer tools and technologies"""
 
     # Tool extraction prompts
+    # Approximate tokens of each article given to the extraction prompt, after condensing
+    ARTICLE_TOKEN_BUDGET = 400
+
     TOOL_EXTRACTION_SYSTEM = """You are a tech researcher. Extract specific tool, library, platform, or service names from articles.
                             Focus on actual products/tools that developers can use, not general concepts or features."""
 
@@ -30,6 +35,9 @@ class DeveloperToolsPrompts:
                 Nhost"""
 
     # Company/Tool analysis prompts
+    # Approximate tokens of website content given to the analysis prompt, after condensing
+    TOOL_ANALYSIS_TOKEN_BUDGET = 700
+
     TOOL_ANALYSIS_SYSTEM = """You are analyzing developer tools and programming technologies. 
                             Focus on extracting information relevant to programmers and software developers. 
                             Pay special attention to programming languages, frameworks, APIs, SDKs, and development workflows."""
@@ -37,7 +45,7 @@ class DeveloperToolsPrompts:
     @staticmethod
     def tool_analysis_user(company_name: str, content: str) -> str:
         return f"""Company/Tool: {company_name}
-                Website Content: {content[:2500]}
+                Website Content: {content}
 
                 Analyze this content from a developer's perspective and provide:
                 - pricing_model: One of "Free", "Freemium", "Paid", "Enterprise", or "Unknown"
@@ -50,6 +58,14 @@ class DeveloperToolsPrompts:
 
                 Focus on developer-relevant features like APIs, SDKs, language support, integrations, and development workflows."""
 
+    @classmethod
+    def tool_analysis_version(cls) -> str:
+        # Fingerprint of the analysis prompts, changes whenever either template is edited
+        # Render the template with placeholder values so only the template text is hashed
+        template = cls.tool_analysis_user("{company_name}", "{content}")
+        digest = hashlib.sha256(f"{cls.TOOL_ANALYSIS_SYSTEM}\n{template}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
     # Recommendation prompts
     RECOMMENDATIONS_SYSTEM = """You are a senior software engineer providing quick, concise tech recommendations. 
                             Keep responses brief and actionable - maximum 3-4 sentences total."""
@@ -0,0 +1,287 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+
+from .metrics import Metrics, NULL_METRICS
+
+# Client-side rate control for external APIs (Firecrawl, OpenAI)
+# - TokenBucket caps the request rate
+# - AIMDLimiter caps requests in flight: +1 after each success, halved when the provider throttles us
+# - RateController combines both and retries throttled/transient failures with jittered exponential
+#   backoff, waiting at least as long as the provider's Retry-After
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Takes a token and returns how long the caller must wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows additively on success and shrinks multiplicatively on throttling"""
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64, decrease: float = 0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def _try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        # Shared with threads, so poll rather than block the event loop on the condition
+        delay = 0.005
+        while not self._try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            # Roughly +1 per limit's worth of successes, i.e. +1 per "round trip" of the window
+            self.limit = min(self.maximum, self.limit + 1.0 / max(1.0, self.limit))
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+_STATUS_IN_MESSAGE = re.compile(r"\b(429|50[0234])\b")
+# "please retry after 41s", "Please try again in 120ms", for errors that only carry a message
+_RETRY_AFTER_IN_MESSAGE = re.compile(r"(?:retry after|try again in)\s+(\d+(?:\.\d+)?)\s*(ms|s|sec|seconds?)?\b")
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    # Returns (retryable, throttled, retry_after_seconds) for an exception from an API client
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    message = str(exc).lower()
+    if status is None:
+        match = _STATUS_IN_MESSAGE.search(message)
+        if match:
+            status = int(match.group(1))
+
+    throttled = status == 429 or "rate limit" in message or "too many requests" in message
+    transient = (
+        (isinstance(status, int) and status >= 500)
+        or isinstance(exc, (TimeoutError, ConnectionError))
+        or "timeout" in type(exc).__name__.lower()
+        or "connection" in type(exc).__name__.lower()
+    )
+    return throttled or transient, throttled, _retry_after(exc, response, message)
+
+
+def _retry_after(exc: BaseException, response: Any, message: str) -> Optional[float]:
+    # Headers of the response, or of the error itself when the client attaches them there
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None)
+    if not headers:
+        match = _RETRY_AFTER_IN_MESSAGE.search(message)
+        if not match:
+            return None
+        seconds = float(match.group(1))
+        return seconds / 1000 if match.group(2) == "ms" else seconds
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class RateController:
+    """Rate limit, adaptive concurrency and retries for one backend, shared by every caller of that backend"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        initial_concurrency: int = 8,
+        max_concurrency: int = 64,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.name = name
+        # No bucket when rate is None, only the adaptive concurrency limit applies
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limiter = AIMDLimiter(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or NULL_METRICS
+        self._random = random.Random()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # Full jitter: anywhere between 0 and the exponential cap, but never sooner than Retry-After
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = self._random.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _record_failure(self, exc: BaseException) -> None:
+        # Back off the concurrency limit when the provider throttles us
+        _, throttled, _ = classify_error(exc)
+        if throttled:
+            self.limiter.on_throttle()
+            self.metrics.count(f"rate.{self.name}.throttled")
+
+    def _retry_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        # Delay before the next attempt, or None when the error should be raised
+        retryable, _, retry_after = classify_error(exc)
+        if not retryable or attempt + 1 >= self.max_attempts:
+            return None
+        self.metrics.count(f"rate.{self.name}.retries")
+        return self.backoff(attempt, retry_after)
+
+    @contextmanager
+    def slot(self):
+        # One rate-limited request without retries
+        if self.bucket is not None:
+            self.bucket.acquire()
+        self.limiter.acquire()
+        try:
+            yield
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        else:
+            self.limiter.on_success()
+        finally:
+            self.limiter.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        if self.bucket is not None:
+            await self.bucket.aacquire()
+        await self.limiter.aacquire()
+        try:
+            yield
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        else:
+            self.limiter.on_success()
+        finally:
+            self.limiter.release()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            try:
+                with self.slot():
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            # Sleep outside the slot so waiting doesn't hold a concurrency permit
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            try:
+                async with self.aslot():
+                    return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stream(self, fn: Callable[..., Iterator[Any]], *args, **kwargs) -> Iterator[Any]:
+        # Streamed response, retried like call() while nothing has been received
+        # Once a chunk went out to the caller the stream can't be replayed, so later failures are raised
+        attempt = 0
+        while True:
+            received = False
+            try:
+                with self.slot():
+                    for chunk in fn(*args, **kwargs):
+                        received = True
+                        yield chunk
+                return
+            except Exception as e:
+                delay = None if received else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def astream(self, fn: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        attempt = 0
+        while True:
+            received = False
+            try:
+                async with self.aslot():
+                    async for chunk in fn(*args, **kwargs):
+                        received = True
+                        yield chunk
+                return
+            except Exception as e:
+                delay = None if received else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
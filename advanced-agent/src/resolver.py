@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .naming import normalize_tool_name
+
+# Turns raw tool names from LLM output and page titles into research targets
+# - cleanup: bullets, numbering, markdown and trailing descriptions are removed
+# - identity: names are matched against a local alias index by alias, by domain and by likely typos,
+#   so "1. supabase.com" and "Supabse" both become the canonical "Supabase", while "PostgresML" stays its own tool
+# - filtering: generic terms and article titles are dropped before any network call
+
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(__file__), "data", "tool_aliases.json")
+
+# Terms the extraction prompt sometimes returns that are categories, not products
+GENERIC_TERMS = {
+    "api", "apis", "auth", "authentication", "backend", "backend as a service", "baas", "cloud", "cloud hosting",
+    "database", "databases", "etc", "framework", "frameworks", "graphql", "hosting", "library", "n a", "none",
+    "open source", "orm", "other", "others", "platform", "platforms", "rest api", "sdk", "sdks", "serverless",
+    "service", "services", "sql", "nosql", "storage", "tool", "tools", "unknown",
+}
+
+# Words that mark an article or listicle title rather than a product name
+TITLE_WORDS = {"alternative", "alternatives", "best", "comparison", "compared", "guide", "how", "review", "reviews", "top", "versus", "vs"}
+
+# Top-level domains accepted when a name looks like a domain, so "Node.js" is not read as one
+DOMAIN_SUFFIXES = {"ai", "app", "cloud", "co", "com", "dev", "io", "net", "org", "sh", "so", "team", "tech"}
+
+# Longest name (in words) still treated as a product
+MAX_NAME_WORDS = 5
+
+_BULLET = re.compile(r"^(?:[-*+•·>]+|\(?\d+[.)]|#\d+|\d+\s*[-:])\s*")
+_DESCRIPTION = re.compile(r"\s+[-–—|]\s+|:\s|\s\(")
+_DOMAIN = re.compile(r"^(?:https?://)?(?:www\.)?((?:[a-z0-9-]+\.)+([a-z]{2,}))(?:[/?#].*)?$")
+
+
+class ResolvedTool(NamedTuple):
+    name: str  # Canonical name for known tools, the cleaned name otherwise
+    website: Optional[str] = None  # Official site when it is known without searching
+    known: bool = False  # Matched an entry of the alias index
+
+
+def clean_tool_name(raw: str) -> str:
+    # "1. **Supabase** - open source Firebase alternative" -> "Supabase"
+    name = raw.replace("*", "").replace("`", "").strip()
+    name = _BULLET.sub("", name).strip()
+    name = _DESCRIPTION.split(name, maxsplit=1)[0]
+    return " ".join(name.split()).strip(" \"'.,;:")
+
+
+def domain_of(name: str) -> Optional[str]:
+    # "https://www.supabase.com/docs" -> "supabase.com", None when the name isn't a domain or URL
+    match = _DOMAIN.match(name.strip().lower())
+    if not match or match.group(2) not in DOMAIN_SUFFIXES:
+        return None
+    return match.group(1)
+
+
+class ToolResolver:
+    """Resolves raw tool names against a local alias index of known developer tools"""
+
+    def __init__(self, aliases_path: str = DEFAULT_ALIASES_PATH, max_edits: int = 2):
+        # Typo budget for names of 8+ characters, shorter names get one edit so "Neon" and "Nhost" stay apart
+        self.max_edits = max_edits
+        self._by_alias: Dict[str, ResolvedTool] = {}
+        self._by_domain: Dict[str, ResolvedTool] = {}
+        # Websites learned from names given as domains, e.g. "socket.io", so research can skip the search
+        self._learned: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        with open(aliases_path, encoding="utf-8") as f:
+            entries = json.load(f)
+        for entry in entries:
+            tool = ResolvedTool(entry["name"], entry.get("website"), True)
+            for alias in [entry["name"], *entry.get("aliases", [])]:
+                self._by_alias[normalize_tool_name(alias)] = tool
+            for domain in entry.get("domains", []):
+                self._by_domain[domain.lower()] = tool
+        self._alias_keys = list(self._by_alias)
+
+    def resolve(self, raw: str) -> Optional[ResolvedTool]:
+        # None when the name is empty or clearly not a product
+        name = clean_tool_name(raw)
+        if not name:
+            return None
+
+        domain = domain_of(name)
+        if domain is not None:
+            known = self._known_domain(domain)
+            if known is not None:
+                return known
+            # An unknown tool given by its domain is still identified by it, and its site is the domain
+            website = f"https://{domain}"
+            with self._lock:
+                self._learned[normalize_tool_name(domain)] = website
+            return ResolvedTool(domain, website)
+
+        key = normalize_tool_name(name)
+        if key in self._by_alias:
+            return self._by_alias[key]
+        if self._is_generic(key):
+            return None
+
+        # Misspellings of known tools, short names are too easy to confuse
+        if len(key) >= 5:
+            match = self._typo_of(key)
+            if match is not None:
+                return self._by_alias[match]
+        return ResolvedTool(name)
+
+    def resolve_all(self, raw_names: Iterable[str]) -> List[ResolvedTool]:
+        # Resolved tools in input order, each tool once
+        tools: List[ResolvedTool] = []
+        seen = set()
+        for raw in raw_names:
+            tool = self.resolve(raw)
+            if tool is None:
+                continue
+            key = normalize_tool_name(tool.name)
+            if key not in seen:
+                seen.add(key)
+                tools.append(tool)
+        return tools
+
+    def resolve_site(self, url: str) -> Optional[ResolvedTool]:
+        # Known tool a page belongs to, judged by its domain only
+        domain = domain_of(url)
+        return self._known_domain(domain) if domain else None
+
+    def website(self, tool_name: str) -> Optional[str]:
+        # Official site for a resolved name, None when it has to be searched for
+        key = normalize_tool_name(tool_name)
+        known = self._by_alias.get(key)
+        if known is not None:
+            return known.website
+        with self._lock:
+            return self._learned.get(key)
+
+    def _known_domain(self, domain: str) -> Optional[ResolvedTool]:
+        # Subdomains belong to their tool, "app.supabase.com" is Supabase
+        parts = domain.split(".")
+        for i in range(len(parts) - 1):
+            known = self._by_domain.get(".".join(parts[i:]))
+            if known is not None:
+                return known
+        return None
+
+    def _typo_of(self, key: str) -> Optional[str]:
+        # Closest alias within the typo budget, with the same number of words
+        # A known name with something added is a different product: "PostgREST", "Cloudflare Workers KV"
+        if any(key.startswith(alias) for alias in self._alias_keys):
+            return None
+        budget = 1 if len(key) < 8 else self.max_edits
+        words = len(key.split())
+        best, best_distance = None, budget + 1
+        for alias in self._alias_keys:
+            if len(alias.split()) != words or abs(len(alias) - len(key)) > budget:
+                continue
+            distance = _edit_distance(key, alias, budget)
+            if distance < best_distance:
+                best, best_distance = alias, distance
+        return best
+
+    def _is_generic(self, key: str) -> bool:
+        words = key.split()
+        return (
+            key in GENERIC_TERMS
+            or len(words) > MAX_NAME_WORDS
+            or any(word in TITLE_WORDS for word in words)
+            or not re.search(r"[a-z]", key)
+        )
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    # Levenshtein distance, anything over `limit` is reported as limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
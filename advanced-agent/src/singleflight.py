@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .metrics import Metrics, NULL_METRICS
+
+# Single-flight: while a call for a key is running, other callers with the same key wait for its result
+# instead of starting their own. Nothing is kept once the call finishes, so later callers run it again.
+# If the call raises, every caller waiting on it gets the same exception.
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key across threads"""
+
+    def __init__(self, metrics: Optional[Metrics] = None, name: str = "singleflight"):
+        self.metrics = metrics or NULL_METRICS
+        self.name = name
+        self.executions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                # Forget the call so the next request after it finishes runs fresh
+                with self._lock:
+                    del self._calls[key]
+        else:
+            self.metrics.count(f"{self.name}.coalesced")
+
+        # Raises the call's exception for the leader and every waiter alike
+        return future.result()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": self.in_flight()}
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key on one event loop"""
+
+    def __init__(self, metrics: Optional[Metrics] = None, name: str = "singleflight"):
+        self.metrics = metrics or NULL_METRICS
+        self.name = name
+        self.executions = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            self.metrics.count(f"{self.name}.coalesced")
+        else:
+            # The call runs as its own task, so a caller that is cancelled (the first one included) only stops
+            # waiting for it and the other callers still get its result
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        # Forget the call so the next request after it finishes runs fresh
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": self.in_flight()}
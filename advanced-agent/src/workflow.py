@@ -1,215 +1,1084 @@
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
+import asyncio
+import contextvars
+import hashlib
+import functools
+import threading
+import uuid
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+# langgraph, langchain_openai and langchain_core take seconds to import, so they are imported where first used
 # Local imports
-from .models import ResearchState, CompanyInfo, CompanyAnalysis
-from .firecrawl import FirecrawlService
+from .models import (
+    ResearchState,
+    CompanyInfo,
+    CompanyAnalysis,
+    ToolsExtracted,
+    CompanyResearched,
+    RecommendationToken,
+    RunCompleted,
+    WorkflowEvent,
+)
+from .firecrawl import FirecrawlService, AsyncFirecrawlService
+from .cache import Cache
+from .batch import ResearchMemo
+from .knowledge import CompanyKnowledgeBase, KnowledgeRecord
+from .naming import normalize_tool_name
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .ratelimit import RateController
+from .checkpoint import RunStore, current_run
+from .blobs import BlobStore, MemoryBlobStore
+from .resolver import ToolResolver
+from .metrics import Metrics, NULL_METRICS
 from .prompts import DeveloperToolsPrompts
+from .condense import condense, ANALYSIS_TERMS
+
+
+# Stream events are only delivered when the graph is run through Workflow.stream
+# Outside of a graph run (or with plain invoke) events are dropped
+def _stream_writer():
+    from langgraph.config import get_stream_writer
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda event: None
+
+
+# Async steps call the stores through this: stores on disk (SQLite, blob files) run in a worker thread so the
+# event loop keeps serving other runs, missing and in-memory stores are called directly
+async def _store_call(store, fn, *args):
+    if store is None or getattr(store, "in_memory", False):
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+class _ToolLineBuffer:
+    # Collects a streamed one-tool-per-line answer and hands back each tool name once its line is complete
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.text = ""
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        self._pending += chunk
+        if "\n" not in self._pending:
+            return []
+        complete, self._pending = self._pending.rsplit("\n", 1)
+        return self.parse(complete)
+
+    def flush(self) -> List[str]:
+        # The last line has no trailing newline, it is only complete once the stream ends
+        names, self._pending = self.parse(self._pending), ""
+        return names
+
+
+@functools.lru_cache(maxsize=None)
+def _token_usage_handler_class():
+    # Defined on first use so langchain_core is only imported once a chat model is built
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _TokenUsageHandler(BaseCallbackHandler):
+        # Reports prompt/completion tokens of every chat model call to the metrics
+        # Runs inline so the usage lands on the span that made the call
+        run_inline = True
+
+        def __init__(self, metrics: Metrics):
+            self.metrics = metrics
+
+        def on_llm_end(self, response, **kwargs) -> None:
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        self.metrics.record_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+                        return
+            usage = (response.llm_output or {}).get("token_usage")
+            if usage:
+                self.metrics.record_tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+    return _TokenUsageHandler
+
+
+# Graph nodes as (name, sync step, async step), the steps are Workflow methods
+_STAGED_NODES = (
+    ("extract_tools", "_extract_tools_step", "_aextract_tools_step"),
+    ("research", "_research_step", "_aresearch_step"),
+    ("analyze", "_analyze_step", "_aanalyze_step"),
+)
+# Pipelined mode overlaps extraction and research in one node, analyze starts as soon as the last tool is done
+_PIPELINED_NODES = (
+    ("extract_and_research", "_pipelined_step", "_apipelined_step"),
+    ("analyze", "_analyze_step", "_aanalyze_step"),
+)
+
+_graphs: Dict[tuple, Any] = {}
+_graphs_lock = threading.Lock()
+
+
+# Compiled graphs hold no Workflow, the nodes find the one running them in config["configurable"]["workflow"]
+# So each graph shape is compiled once per process, on first use, and shared by every Workflow
+def compiled_graph(pipelined: bool = False, use_async: bool = False):
+    key = (pipelined, use_async)
+    with _graphs_lock:
+        if key not in _graphs:
+            _graphs[key] = _build_graph(pipelined, use_async)
+        return _graphs[key]
+
+
+def _build_graph(pipelined: bool, use_async: bool):
+    from langgraph.graph import StateGraph, END
+
+    # Initialize the state graph
+    graph = StateGraph(ResearchState)
+    nodes = _PIPELINED_NODES if pipelined else _STAGED_NODES
+
+    # Creating nodes for graph (3 steps = 3 nodes, 2 when pipelined)
+    for name, step, async_step in nodes:
+        graph.add_node(name, _graph_node(name, async_step if use_async else step, use_async))
+
+    # Set entry point for the workflow (first step), then the order of execution
+    graph.set_entry_point(nodes[0][0])
+    for (name, _, _), (next_name, _, _) in zip(nodes, nodes[1:]):
+        graph.add_edge(name, next_name)
+    # Final edge (must have), to indicate end of workflow
+    graph.add_edge(nodes[-1][0], END)
+
+    return graph.compile()
+
+
+def _graph_node(name: str, step: str, use_async: bool):
+    if use_async:
+        async def node(state: ResearchState, config) -> Dict[str, Any]:
+            workflow = _node_workflow(config)
+            return await workflow._arun_node(name, getattr(workflow, step), state)
+    else:
+        def node(state: ResearchState, config) -> Dict[str, Any]:
+            workflow = _node_workflow(config)
+            return workflow._run_node(name, getattr(workflow, step), state)
+    return node
+
+
+def _node_workflow(config) -> "Workflow":
+    workflow = (config or {}).get("configurable", {}).get("workflow")
+    if workflow is None:
+        raise RuntimeError(
+            "compiled_graph() is shared by every Workflow, run it through Workflow.workflow (or Workflow.run) "
+            "or pass config={'configurable': {'workflow': workflow}}"
+        )
+    return workflow
 
 
 class Workflow:
-    
-    def __init__(self):
-        self.firecrawl = FirecrawlService()
-        self.llm = ChatOpenAI(model = "gpt-4o-mini", temperature = 0.1)
+
+    # How many of the extracted tools get researched
+    MAX_RESEARCHED_TOOLS = 4
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        cache: Optional[Cache] = None,
+        analysis_cache: Optional[Cache] = None,
+        firecrawl: Optional[FirecrawlService] = None,
+        async_firecrawl: Optional[AsyncFirecrawlService] = None,
+        llm=None,
+        research_memo: Optional[ResearchMemo] = None,
+        metrics: Optional[Metrics] = None,
+        knowledge_base: Optional[CompanyKnowledgeBase] = None,
+        firecrawl_rate: Optional[RateController] = None,
+        openai_rate: Optional[RateController] = None,
+        pipelined: bool = False,
+        run_store: Optional[RunStore] = None,
+        blob_store: Optional[BlobStore] = None,
+        resolver: Optional[ToolResolver] = None,
+    ):
+        # Timing and usage instrumentation, off unless a Metrics instance is passed in
+        self.metrics = metrics or NULL_METRICS
+        # Rate control per backend, shared by the sync and async paths and every query on this workflow
+        self.firecrawl_rate = firecrawl_rate or RateController("firecrawl", metrics=self.metrics)
+        self.openai_rate = openai_rate or RateController("openai", metrics=self.metrics)
+        # Services can be passed in (e.g. local stand-ins), otherwise the real clients are built
+        self.firecrawl = firecrawl or FirecrawlService(cache=cache, metrics=self.metrics, rate=self.firecrawl_rate)
+        # Only arun and astream need the async service, it is built on first use so a sync stand-in is enough otherwise
+        self._async_firecrawl = async_firecrawl
+        self._async_firecrawl_lock = threading.Lock()
+        self._cache = cache
+        # Chat model, built on first use unless one is passed in
+        self._llm = llm
+        self._llm_lock = threading.Lock()
         self.prompts = DeveloperToolsPrompts()
-        self.workflow = self._build_workflow()
+        # Upper bound on how many tools are researched at the same time
+        self.max_concurrency = max(1, max_concurrency)
+        # Memoized structured analyses, keyed by content hash, company and prompt version
+        self.analysis_cache = analysis_cache
+        # When set, tools are researched once and shared by every query running through this workflow
+        self.research_memo = research_memo
+        # Concurrent queries asking for the same tool share one in-flight research instead of repeating it
+        self.single_flight = SingleFlight(metrics=self.metrics, name="research")
+        self.async_single_flight = AsyncSingleFlight(metrics=self.metrics, name="research")
+        # Previously researched companies, fresh records skip research and stale ones are refreshed in the background
+        self.knowledge_base = knowledge_base
+        # At most 2 background refreshes run at a time, none start once the workflow is closed
+        self._refresh_slots = threading.BoundedSemaphore(2)
+        self._closed = False
+        self._background_tasks: set = set()
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        # Research each tool as soon as the extraction stream names it instead of after the whole list
+        self.pipelined = pipelined
+        # Checkpoints of each node and researched tool, runs started with a run_id can be resumed after a failure
+        self.run_store = run_store
+        # Page markdown lives here and the state only carries references to it
+        self.blobs = blob_store or MemoryBlobStore()
+        # Cleans up, dedupes and filters tool names before research, and knows the official sites of common tools
+        self.resolver = resolver or ToolResolver()
+
+    # One chat model shared by every query, its HTTP connection pool is reused by sync and async calls
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from langchain_openai import ChatOpenAI
+
+                    self._llm = ChatOpenAI(
+                        model = "gpt-4o-mini",
+                        temperature = 0.1,
+                        # Report token usage on streamed responses too
+                        stream_usage = True,
+                        # Retries are handled by openai_rate so throttling also slows down the other calls
+                        max_retries = 0,
+                        callbacks = [_token_usage_handler_class()(self.metrics)] if self.metrics.enabled else None,
+                    )
+        return self._llm
+
+    @property
+    def async_firecrawl(self) -> AsyncFirecrawlService:
+        if self._async_firecrawl is None:
+            with self._async_firecrawl_lock:
+                if self._async_firecrawl is None:
+                    self._async_firecrawl = AsyncFirecrawlService(
+                        cache=self._cache, metrics=self.metrics, rate=self.firecrawl_rate
+                    )
+        return self._async_firecrawl
+
+    # The shared compiled graph bound to this workflow, so it can be invoked or streamed on its own
+    @property
+    def workflow(self):
+        return compiled_graph(pipelined=self.pipelined).with_config(self._config())
+
+    # Same graph with async nodes, used by arun and astream
+    @property
+    def async_workflow(self):
+        return compiled_graph(pipelined=self.pipelined, use_async=True).with_config(self._config())
+
+    # Build the clients and graphs ahead of the first query, e.g. while the user is still typing
+    def warm_up(self) -> None:
+        try:
+            # Every prompt is built from these
+            from langchain_core.messages import SystemMessage, HumanMessage  # noqa: F401
+
+            self.llm
+            self.firecrawl.warm_up()
+            self.workflow
+            self.async_workflow
+            # Warmed only when passed in, building it needs a Firecrawl key a sync-only caller may not have
+            if self._async_firecrawl is not None:
+                self._async_firecrawl.warm_up()
+        except Exception:
+            # Whatever failed here fails again, with its error shown, when the first query needs it
+            pass
+
+    # Config that lets the shared graph's nodes find this workflow, bound by the workflow properties
+    def _config(self) -> Dict[str, Any]:
+        return {"configurable": {"workflow": self}}
+
+
+    # Run one graph node, timed as a "node.<name>" span
+    # A node the run already finished is replayed from its checkpoint, otherwise its state update is checkpointed
+    def _run_node(self, name: str, step, state: ResearchState) -> Dict[str, Any]:
+        with self.metrics.span(f"node.{name}"):
+            saved = self._saved_update(name, state)
+            if saved is not None:
+                return saved
+            # Lets the per-tool checkpoints inside the node find the run
+            token = current_run.set(state.run_id)
+            try:
+                update = step(state)
+            finally:
+                current_run.reset(token)
+            self._save_update(name, state, update)
+            return update
+
+    async def _arun_node(self, name: str, step, state: ResearchState) -> Dict[str, Any]:
+        with self.metrics.span(f"node.{name}"):
+            saved = await _store_call(self.run_store, self._saved_output, name, state)
+            if saved is not None:
+                return self._replay_update(state, saved)
+            token = current_run.set(state.run_id)
+            try:
+                update = await step(state)
+            finally:
+                current_run.reset(token)
+            await _store_call(self.run_store, self._save_update, name, state, update)
+            return update
+
+    def _save_update(self, name: str, state: ResearchState, update: Dict[str, Any]) -> None:
+        if self.run_store is not None and state.run_id:
+            self.run_store.save_node(state.run_id, name, update)
+
+    def _saved_update(self, name: str, state: ResearchState) -> Optional[Dict[str, Any]]:
+        saved = self._saved_output(name, state)
+        return self._replay_update(state, saved) if saved is not None else None
+
+    def _saved_output(self, name: str, state: ResearchState) -> Optional[Dict[str, Any]]:
+        if self.run_store is None or not state.run_id:
+            return None
+        return self.run_store.node_output(state.run_id, name)
+
+    def _replay_update(self, state: ResearchState, saved: Dict[str, Any]) -> Dict[str, Any]:
+        self.metrics.count("checkpoint.replayed")
+        # Turn the saved JSON back into the state's models
+        restored = ResearchState.model_validate({"query": state.query, **saved})
+        update = {key: getattr(restored, key) for key in saved}
+
+        # Stream listeners get the same events the node would have written
+        writer = _stream_writer()
+        if "extracted_tools" in update:
+            writer(ToolsExtracted(tools=update["extracted_tools"]))
+        for i, company in enumerate(update.get("companies", [])):
+            writer(CompanyResearched(index=i, company=company))
+        if update.get("analysis"):
+            writer(RecommendationToken(text=update["analysis"]))
+        return update
 
 
-    def _build_workflow(self):
-        # Initialize the state graph
-        graph = StateGraph(ResearchState)
-        
-        # Creating nodes for graph, referencing fuctions not calling them (3 steps = 3 nodes)
-        graph.add_node("extract_tools", self._extract_tools_step)
-        graph.add_node("research", self._research_step)
-        graph.add_node("analyze", self._analyze_step)
-        
-        # Set entry point for the workflow (first step)
-        graph.set_entry_point("extract_tools")
-        
-        # Set order of execution (after exract_tools, research will be called, then analyze)
-        graph.add_edge("extract_tools", "research")
-        graph.add_edge("research", "analyze")
-        # Final edge (must have), to indicate end of workflow
-        graph.add_edge("analyze", END) 
-        
-        return graph.compile()
-        
-    
     # Set up langgraph
     # Create graph that agent flows through
     # Control state at which agent is at
-    # First stage: extract various candidate tools 
+    # First stage: extract various candidate tools
     # Second stage: research particular tools
     # Third stage: analyze and recommend tools based on research findings
-    
-    
+
+
     # Create private methods
-    
-    # Step to extract tools from articles based on user query
-    def _extract_tools_step(self, state: ResearchState) -> Dict[str, Any]:
-        
-        # Will use ResearchState from models and return a Dict full of candidate tools
-        print(f"🕵🏽‍♂️ Finding articles about: {state.query}")
-        
-        article_query = f"{state.query} tools comparison best alternatives"
+
+    # Helpers shared by the sync and async steps
+
+    # Search results kept in the state: url, title and a reference to the article's markdown in the blob store
+    def _article_refs(self, articles: List[Dict[str, Any]], contents: List[str]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "url": article.get("url", ""),
+                "title": article.get("metadata", {}).get("title", ""),
+                "content_ref": self.blobs.put(content),
+            }
+            for article, content in zip(articles, contents)
+        ]
+
+    # All article content combined into 1 string to give to LLM for analysis of result tools for more info
+    # Each article is condensed to the sections most relevant to the query instead of just its first characters
+    def _extraction_messages(self, query: str, search_results: List[Dict[str, Any]]) -> list:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        all_content = ""
+        for result in search_results:
+            content = self.content(result.get("content_ref"))
+            if content:
+                all_content += condense(content, f"{query} tools alternatives", self.prompts.ARTICLE_TOKEN_BUDGET) + "\n\n"
+
+        return [
+            SystemMessage(content=self.prompts.TOOL_EXTRACTION_SYSTEM),
+            HumanMessage(content=self.prompts.tool_extraction_user(query, all_content))
+        ]
+
+    # Parse out tools from the LLM response, one tool per line
+    # Each line is resolved to a canonical tool name, duplicates and generic terms are dropped
+    def _parse_tool_names(self, text: str) -> List[str]:
+        return [tool.name for tool in self.resolver.resolve_all(text.strip().split("\n"))]
+
+    # Replace tool_names with title of website searched for, used when no tools could be extracted
+    # A result on a known tool's domain counts as that tool, other titles are cleaned and article titles dropped
+    def _fallback_tool_names(self, search_results) -> List[str]:
+        names = []
+        for result in (search_results.data if search_results else []):
+            site = self.resolver.resolve_site(result.get("url", ""))
+            names.append(site.name if site else result.get("metadata", {}).get("title", ""))
+        return [tool.name for tool in self.resolver.resolve_all(names)]
+
+    def _analysis_messages(self, company_name: str, content: str) -> list:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        return [
+            SystemMessage(content=self.prompts.TOOL_ANALYSIS_SYSTEM),
+            HumanMessage(content=self.prompts.tool_analysis_user(company_name, content))
+        ]
+
+    # If analysis fails, return an empty CompanyAnalysis object to avoid crash
+    def _failed_analysis(self) -> CompanyAnalysis:
+        return CompanyAnalysis(
+            pricing_model="Unknown",
+            is_open_source=None,
+            tech_stack=[],
+            description="Failed",
+            api_available=None,
+            language_support=[],
+            integration_capabilities=[]
+        )
+
+    # Create a CompanyInfo object with the tool name and the official site search result
+    # The page's markdown goes to the blob store, the description starts as the page's meta description
+    def _new_company(self, tool_name: str, result: Dict[str, Any]) -> CompanyInfo:
+        return CompanyInfo(
+            name=tool_name,
+            description=result.get("metadata", {}).get("description") or "",
+            website=result.get("url", ""),
+            content_ref=self.blobs.put(result.get("markdown")),
+            tech_stack=[],
+            competitors=[]
+        )
+
+    # Update the company object with analysis results
+    def _apply_analysis(self, company: CompanyInfo, analysis: CompanyAnalysis) -> None:
+        company.pricing_model = analysis.pricing_model
+        company.is_open_source = analysis.is_open_source
+        company.tech_stack = analysis.tech_stack
+        company.description = analysis.description
+        company.api_available = analysis.api_available
+        company.language_support = analysis.language_support
+        company.integration_capabilities = analysis.integration_capabilities
+
+    def _recommendation_messages(self, state: ResearchState) -> list:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        company_data = ", ".join([
+            # Look through all companies and convert to json, pass to model
+            company.json(exclude={"content_ref"}) for company in state.companies
+        ])
+
+        return [
+            SystemMessage(content=self.prompts.RECOMMENDATIONS_SYSTEM),
+            HumanMessage(content=self.prompts.recommendations_user(state.query, company_data))
+        ]
+
+    # Find articles comparing tools for the query, their markdown is stored in the blob store
+    def _articles(self, query: str) -> List[Dict[str, Any]]:
+        print(f"🕵🏽‍♂️ Finding articles about: {query}")
+
+        article_query = f"{query} tools comparison best alternatives"
         # Search the article_query on the interet using Firecrawl method and return 3 results
         # These results will be in the form of urls
         search_results = self.firecrawl.search_companies(article_query, num_results=3)
-        
-        # All search results from firecrawl combined into 1 string to give to LLM for analysis of result tools for more info
-        all_content = ""
-        for result in search_results.data:
-            # Get the URL from the result
-            url = result.get("url", "")
-            # Scrape each article using Firecrawl method
-            scraped = self.firecrawl.scrape_company_pages(url)
-            # If the scraping was successful, append the content to all_content
-            if scraped:
-                all_content += scraped.markdown[:1500] + "\n\n"
-                
+
+        # Search already asks Firecrawl for markdown, so reuse it and only scrape the results that came back empty
+        articles = search_results.data if search_results else []
+        contents = [result.get("markdown") or "" for result in articles]
+        missing = [i for i, content in enumerate(contents) if not content and articles[i].get("url")]
+
+        # Scrape any articles without content side by side instead of one after another
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), self.max_concurrency)) as executor:
+                # Each task runs in a copy of this context so its spans land in the current run's trace
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self.firecrawl.scrape_company_pages, articles[i].get("url", ""))
+                    for i in missing
+                ]
+                for i, future in zip(missing, futures):
+                    scraped = future.result()
+                    # If the scraping was successful, use its content for that article
+                    if scraped:
+                        contents[i] = scraped.markdown or ""
+        return self._article_refs(articles, contents)
+
+    # Step to extract tools from articles based on user query
+    def _extract_tools_step(self, state: ResearchState) -> Dict[str, Any]:
+
+        # Will use ResearchState from models and return a Dict full of candidate tools
+        search_results = self._articles(state.query)
+
         # Pass content to LLM
-        messages = [
-            SystemMessage(content=self.prompts.TOOL_EXTRACTION_SYSTEM),
-            HumanMessage(content=self.prompts.tool_extraction_user(state.query, all_content))
-        ]
-        
+        messages = self._extraction_messages(state.query, search_results)
+
         # Get the response from the LLM
         # Parse out tools from response and update state
         try:
-            response = self.llm.invoke(messages)
-            tool_names = [
-                name.strip()
-                # Give tools on new lines
-                for name in response.content.strip().split("\n")
-                # Filter out empty lines (check if name exists)
-                if name.strip()  
-            ]
+            with self.metrics.span("llm.extract_tools"):
+                response = self.openai_rate.call(self.llm.invoke, messages)
+            tool_names = self._parse_tool_names(response.content)
             print(f"🔧 Extracted tools: {','.join(tool_names[:5])}")
+            _stream_writer()(ToolsExtracted(tools=tool_names))
             # Setting extracted_tools in the state using langgraph
-            return {"extracted_tools": tool_names}
+            return {"extracted_tools": tool_names, "search_results": search_results}
         except Exception as e:
             print(f"Error during tool extraction: {e}")
-            return {"extracted_tools": []}
-        
-    
+            return {"extracted_tools": [], "search_results": search_results}
+
+
+    # Page content for the analysis prompt: boilerplate removed and the sections about pricing, licensing,
+    # APIs, languages and integrations packed into the token budget
+    def _analysis_content(self, company_name: str, content: str) -> str:
+        return condense(content, f"{company_name} {ANALYSIS_TERMS}", self.prompts.TOOL_ANALYSIS_TOKEN_BUDGET)
+
+    # Cache key for an analysis of condensed content, editing the analysis prompt changes the version and invalidates old entries
+    def _analysis_key(self, company_name: str, content: str) -> str:
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        name = " ".join(company_name.lower().split())
+        return f"analysis:{self.prompts.tool_analysis_version()}:{name}:{content_hash}"
+
     # Step to analyze each tool (helper method)
     def _analyze_company_content(self, company_name: str, content: str) -> CompanyAnalysis:
+
+        # Only the condensed content is sent, so that is also what the memo is keyed on
+        content = self._analysis_content(company_name, content)
         
+        # Reuse a previous analysis of the exact same content if there is one
+        key = self._analysis_key(company_name, content)
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get(key)
+            if cached is not None:
+                self.metrics.count("analysis_cache.hit")
+                return CompanyAnalysis.model_validate(cached)
+            self.metrics.count("analysis_cache.miss")
+
         # Use the LLM to analyze a specific company/tool based on its content
         structured_llm = self.llm.with_structured_output(CompanyAnalysis)
-        
+
         # Prepare the messages for the LLM analysis
-        messages = [
-            SystemMessage(content=self.prompts.TOOL_ANALYSIS_SYSTEM),
-            HumanMessage(content=self.prompts.tool_analysis_user(company_name, content))
-        ]
-        
+        messages = self._analysis_messages(company_name, content)
+
         try:
             # Invoke the LLM with the messages to get structured analysis
-            analysis = structured_llm.invoke(messages)
+            with self.metrics.span("llm.analyze_company", company=company_name):
+                analysis = self.openai_rate.call(structured_llm.invoke, messages)
+            # Only successful analyses are memoized, failures should be retried next time
+            if self.analysis_cache is not None:
+                self.analysis_cache.set(key, analysis.model_dump())
             return analysis
         except Exception as e:
             print(f"Error during analysis of {company_name}: {e}")
-            # If analysis fails, return an empty CompanyAnalysis object to avoid crash
-            return CompanyAnalysis(
-                pricing_model="Unknown",
-                is_open_source=None,
-                tech_stack=[],
-                description="Failed",
-                api_available=None,
-                language_support=[],
-                integration_capabilities=[]
-            )
-    
-    
+            return self._failed_analysis()
+
+
+    # Research a single tool: search for its official site, scrape it, then analyze the content
+    def _research_tool(self, tool_name: str) -> Optional[CompanyInfo]:
+        # Tools in the alias index already have their official site, skip the search
+        website = self.resolver.website(tool_name)
+        if website:
+            self.metrics.count("resolver.known_site")
+            company = self._new_company(tool_name, {"url": website})
+        else:
+            # Check official site of the tool and find more info
+            tool_search_results = self.firecrawl.search_companies(tool_name + " official sit", num_results=1)
+
+            # If tool_search_results is empty there is nothing to research
+            if not tool_search_results or not tool_search_results.data:
+                return None
+
+            # Get the first result, scrape url for data
+            company = self._new_company(tool_name, tool_search_results.data[0])
+
+        scraped = self.firecrawl.scrape_company_pages(company.website)
+        # If scraping was successful, analyze the content
+        if scraped:
+            company.content_ref = self.blobs.put(scraped.markdown) or company.content_ref
+            analysis = self._analyze_company_content(company.name, scraped.markdown)
+            # Update the company object with analysis results only if scape is successful
+            self._apply_analysis(company, analysis)
+
+        return company
+
+    # Research a tool once per run: a tool finished before a failure is taken from the run's checkpoints on resume
+    def _research_tool_checkpointed(self, tool_name: str) -> Optional[CompanyInfo]:
+        run_id = current_run.get()
+        if self.run_store is None or not run_id:
+            return self._research_tool_shared(tool_name)
+        found, company = self.run_store.saved_tool(run_id, tool_name)
+        if found:
+            self.metrics.count("checkpoint.tool_replayed")
+            return company
+        company = self._research_tool_shared(tool_name)
+        self.run_store.save_tool(run_id, tool_name, company)
+        return company
+
+    # Research a tool through the knowledge base and the research memo (e.g. during a batch) when they are installed
+    def _research_tool_shared(self, tool_name: str) -> Optional[CompanyInfo]:
+        # Known tools come straight from the store, stale ones are refreshed for next time without waiting
+        record = self._known_company(tool_name)
+        if record is not None:
+            if not record.fresh:
+                self._refresh_in_background(tool_name)
+            return record.company
+
+        if self.research_memo is not None:
+            company = self.research_memo.research(tool_name, self._research_tool_coalesced)
+        else:
+            company = self._research_tool_coalesced(tool_name)
+        self._remember(company)
+        return company
+
+    # Research a tool, joining an identical research already running for another query
+    def _research_tool_coalesced(self, tool_name: str) -> Optional[CompanyInfo]:
+        company = self.single_flight.do(normalize_tool_name(tool_name), self._research_tool, tool_name)
+        # Every caller gets its own copy of the shared result
+        return company.model_copy(deep=True) if company else None
+
+    def _known_company(self, tool_name: str) -> Optional[KnowledgeRecord]:
+        if self.knowledge_base is None:
+            return None
+        record = self.knowledge_base.get(tool_name)
+        if record is None:
+            self.metrics.count("knowledge_base.miss")
+        else:
+            self.metrics.count("knowledge_base.fresh" if record.fresh else "knowledge_base.stale")
+        return record
+
+    def _remember(self, company: Optional[CompanyInfo]) -> bool:
+        if self.knowledge_base is None or company is None:
+            return False
+        return self.knowledge_base.put(company)
+
+    # Claim a tool for a background refresh, False if a refresh for it is already running
+    def _claim_refresh(self, tool_name: str) -> bool:
+        key = normalize_tool_name(tool_name)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, tool_name: str) -> None:
+        with self._refresh_lock:
+            self._refreshing.discard(normalize_tool_name(tool_name))
+
+    # Daemon threads rather than an executor, whose workers are joined at exit: quitting the CLI must not wait
+    # for a refresh that is backing off from a throttled API
+    def _refresh_in_background(self, tool_name: str) -> None:
+        if self._closed or not self._claim_refresh(tool_name):
+            return
+        threading.Thread(target=self._background_refresh, args=(tool_name,), name="knowledge-refresh", daemon=True).start()
+
+    def _background_refresh(self, tool_name: str) -> None:
+        with self._refresh_slots:
+            if self._closed:
+                self._release_refresh(tool_name)
+                return
+            self._refresh(tool_name)
+
+    # Stop starting background refreshes, the ones still waiting for a slot are dropped
+    def close(self) -> None:
+        self._closed = True
+
+    def _refresh(self, tool_name: str) -> bool:
+        try:
+            return self._remember(self._research_tool_coalesced(tool_name))
+        except Exception as e:
+            print(f"Error refreshing {tool_name}: {e}")
+            return False
+        finally:
+            self._release_refresh(tool_name)
+
+    # Re-research every stale record in the knowledge base (or every record), returns how many were updated
+    def refresh_knowledge_base(self, stale_only: bool = True) -> int:
+        if self.knowledge_base is None:
+            raise ValueError("Workflow has no knowledge base to refresh")
+
+        names = self.knowledge_base.names(stale_only=stale_only)
+        print(f"♻️ Refreshing {len(names)} companies")
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Tools already being refreshed in the background are skipped
+            refreshed = list(executor.map(lambda name: self._claim_refresh(name) and self._refresh(name), names))
+        return sum(refreshed)
+
     def _research_step(self, state: ResearchState) -> Dict[str, Any]:
         # Look in state for extacted_tools attribute, if found give it extracted_tools variable, if not give empty list
         extracted_tools = getattr(state, "extracted_tools", [])
-        
+
         # Edge case handling
         if not extracted_tools:
             print("⚠️ No tools extracted to research. Falling back to direct search.")
             # Search again
             search_results = self.firecrawl.search_companies(state.query, num_results=4)
-            # Replace tool_names with title of website searched for
-            tool_names = [
-                result.get("metadata", {}).get("title", "Unknown")
-                for result in search_results.data
-            ]
+            tool_names = self._fallback_tool_names(search_results)
         else:
             # This occurs when extracted_tools is populated
-            tool_names = extracted_tools[:4]
-    
+            tool_names = extracted_tools[:self.MAX_RESEARCHED_TOOLS]
+
         print(f"🧐 Researching specific tools: {', '.join(tool_names)}")
-        
-        # Look up each tool and scrape its website content
-        companies = []
-        for tool_name in tool_names:
-            # Check official site of all tools and find more info
-            tool_search_results = self.firecrawl.search_companies(tool_name + " official sit", num_results=1)
 
-            # If tool_search_results is not empty, get the first result, scrape url for data
-            if tool_search_results:
-                result = tool_search_results.data[0]
-                url = result.get("url", "")
-                # Create a CompanyInfo object with the tool name and scraped content
-                company = CompanyInfo(
-                    name=tool_name,
-                    description=result.get("markdown", {}),
-                    website=url,
-                    tech_stack=[],
-                    competitors=[]
-                )
-                
-                scraped = self.firecrawl.scrape_company_pages(url)
-                # If scraping was successful, analyze the content
-                if scraped:
-                    content = scraped.markdown
-                    analysis = self._analyze_company_content(company.name, content)
-                    
-                    # Update the company object with analysis results only if scape is successful
-                    company.pricing_model = analysis.pricing_model
-                    company.is_open_source = analysis.is_open_source
-                    company.tech_stack = analysis.tech_stack
-                    company.description = analysis.description
-                    company.api_available = analysis.api_available
-                    company.language_support = analysis.language_support
-                    company.integration_capabilities = analysis.integration_capabilities
-                    
-                companies.append(company)
-                
+        # Each tool's search -> scrape -> analyze chain is independent, so run them side by side
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._research_tool_checkpointed, tool_name): i
+                for i, tool_name in enumerate(tool_names)
+            }
+            companies = self._collect_research(futures, tool_names)
         return {"companies": companies}
-    
+
+    # Wait for research futures (mapped to their index in tool_names) and return the companies in tool order
+    def _collect_research(self, futures: Dict[Future, int], tool_names: List[str]) -> List[CompanyInfo]:
+        # Results are slotted by position so the final list keeps the order of tool_names
+        writer = _stream_writer()
+        results: List[Optional[CompanyInfo]] = [None] * len(tool_names)
+        # Handle each tool as soon as it finishes so stream listeners see it right away
+        for future in as_completed(futures):
+            i = futures[future]
+            # One tool failing should not take down the rest of the research
+            try:
+                company = future.result()
+            except Exception as e:
+                print(f"Error during research of {tool_names[i]}: {e}")
+                continue
+            results[i] = company
+            if company:
+                writer(CompanyResearched(index=i, company=company))
+        return [company for company in results if company]
+
+    # Pipelined extract_tools + research: the extraction answer is streamed and each tool's research is
+    # started as soon as its line is complete, while the model is still writing the rest of the list
+    def _pipelined_step(self, state: ResearchState) -> Dict[str, Any]:
+        search_results = self._articles(state.query)
+        messages = self._extraction_messages(state.query, search_results)
+
+        lines = _ToolLineBuffer(self._parse_tool_names)
+        tool_names: List[str] = []
+        futures: Dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            def launch(names: List[str]) -> None:
+                for name in names:
+                    # Lines are resolved one at a time, so a tool named twice is only caught here
+                    if normalize_tool_name(name) in map(normalize_tool_name, tool_names):
+                        continue
+                    if len(tool_names) < self.MAX_RESEARCHED_TOOLS:
+                        futures[executor.submit(contextvars.copy_context().run, self._research_tool_checkpointed, name)] = len(tool_names)
+                    tool_names.append(name)
+
+            # Retried until the first chunk arrives, after that tools have gone out to research and it can't be replayed
+            try:
+                with self.metrics.span("llm.extract_tools"):
+                    for chunk in self.openai_rate.stream(self.llm.stream, messages):
+                        if chunk.content:
+                            launch(lines.feed(chunk.content))
+                launch(lines.flush())
+            except Exception as e:
+                # Tools named before the error are still researched
+                print(f"Error during tool extraction: {e}")
+
+            print(f"🔧 Extracted tools: {','.join(tool_names[:5])}")
+            _stream_writer()(ToolsExtracted(tools=tool_names))
+            if tool_names:
+                print(f"🧐 Researching specific tools: {', '.join(tool_names[:self.MAX_RESEARCHED_TOOLS])}")
+            companies = self._collect_research(futures, tool_names[:self.MAX_RESEARCHED_TOOLS])
+
+        if not tool_names:
+            # Nothing was extracted, fall back to researching the search result titles like the staged graph
+            return {"extracted_tools": [], "search_results": search_results, **self._research_step(state)}
+        return {"extracted_tools": tool_names, "search_results": search_results, "companies": companies}
+
     def _analyze_step(self, state: ResearchState) -> Dict[str, Any]:
         print("Generating recommendations")
-        
-        company_data = ", ".join([
-            # Look through all companies and convert to json, pass to model
-            company.json() for company in state.companies
-        ])
-        
-        messages = [
-            SystemMessage(content=self.prompts.RECOMMENDATIONS_SYSTEM),
-            HumanMessage(content=self.prompts.recommendations_user(state.query, company_data))
-        ]
-        
-        # Pass to LLM
-        response = self.llm.invoke(messages)
+
+        messages = self._recommendation_messages(state)
+
+        # Pass to LLM, streaming the answer so listeners can show it token by token
+        writer = _stream_writer()
+        analysis = ""
+        # Retried until the first chunk arrives, after that tokens have gone out and it can't be replayed
+        with self.metrics.span("llm.recommend"):
+            for chunk in self.openai_rate.stream(self.llm.stream, messages):
+                if chunk.content:
+                    analysis += chunk.content
+                    writer(RecommendationToken(text=chunk.content))
         # Updating state with the analysis result
-        return {"analysis": response.content}
-    
-    
+        return {"analysis": analysis}
+
+
+    # Async versions of the steps, same behaviour but awaiting I/O instead of blocking a thread
+    # Used by arun and astream so a single event loop can serve many queries at once
+
+    async def _aarticles(self, query: str) -> List[Dict[str, Any]]:
+        print(f"🕵🏽‍♂️ Finding articles about: {query}")
+
+        article_query = f"{query} tools comparison best alternatives"
+        search_results = await self.async_firecrawl.search_companies(article_query, num_results=3)
+
+        # Reuse the markdown returned by the search, only scrape the results that came back empty
+        articles = search_results.data if search_results else []
+        contents = [result.get("markdown") or "" for result in articles]
+        missing = [i for i, content in enumerate(contents) if not content and articles[i].get("url")]
+
+        scraped_pages = await asyncio.gather(*[
+            self.async_firecrawl.scrape_company_pages(articles[i].get("url", "")) for i in missing
+        ])
+        for i, scraped in zip(missing, scraped_pages):
+            if scraped:
+                contents[i] = scraped.markdown or ""
+        return await _store_call(self.blobs, self._article_refs, articles, contents)
+
+    async def _aextract_tools_step(self, state: ResearchState) -> Dict[str, Any]:
+        search_results = await self._aarticles(state.query)
+        messages = await _store_call(self.blobs, self._extraction_messages, state.query, search_results)
+
+        try:
+            with self.metrics.span("llm.extract_tools"):
+                response = await self.openai_rate.acall(self.llm.ainvoke, messages)
+            tool_names = self._parse_tool_names(response.content)
+            print(f"🔧 Extracted tools: {','.join(tool_names[:5])}")
+            _stream_writer()(ToolsExtracted(tools=tool_names))
+            return {"extracted_tools": tool_names, "search_results": search_results}
+        except Exception as e:
+            print(f"Error during tool extraction: {e}")
+            return {"extracted_tools": [], "search_results": search_results}
+
+    async def _aanalyze_company_content(self, company_name: str, content: str) -> CompanyAnalysis:
+        content = self._analysis_content(company_name, content)
+        key = self._analysis_key(company_name, content)
+        if self.analysis_cache is not None:
+            cached = await _store_call(self.analysis_cache, self.analysis_cache.get, key)
+            if cached is not None:
+                self.metrics.count("analysis_cache.hit")
+                return CompanyAnalysis.model_validate(cached)
+            self.metrics.count("analysis_cache.miss")
+
+        structured_llm = self.llm.with_structured_output(CompanyAnalysis)
+        messages = self._analysis_messages(company_name, content)
+
+        try:
+            with self.metrics.span("llm.analyze_company", company=company_name):
+                analysis = await self.openai_rate.acall(structured_llm.ainvoke, messages)
+            if self.analysis_cache is not None:
+                await _store_call(self.analysis_cache, self.analysis_cache.set, key, analysis.model_dump())
+            return analysis
+        except Exception as e:
+            print(f"Error during analysis of {company_name}: {e}")
+            return self._failed_analysis()
+
+    async def _aresearch_tool(self, tool_name: str) -> Optional[CompanyInfo]:
+        website = self.resolver.website(tool_name)
+        if website:
+            self.metrics.count("resolver.known_site")
+            company = self._new_company(tool_name, {"url": website})
+        else:
+            tool_search_results = await self.async_firecrawl.search_companies(tool_name + " official sit", num_results=1)
+
+            if not tool_search_results or not tool_search_results.data:
+                return None
+
+            company = self._new_company(tool_name, tool_search_results.data[0])
+
+        scraped = await self.async_firecrawl.scrape_company_pages(company.website)
+        if scraped:
+            company.content_ref = await _store_call(self.blobs, self.blobs.put, scraped.markdown) or company.content_ref
+            analysis = await self._aanalyze_company_content(company.name, scraped.markdown)
+            self._apply_analysis(company, analysis)
+
+        return company
+
+    async def _aresearch_tool_checkpointed(self, tool_name: str) -> Optional[CompanyInfo]:
+        run_id = current_run.get()
+        if self.run_store is None or not run_id:
+            return await self._aresearch_tool_shared(tool_name)
+        found, company = await _store_call(self.run_store, self.run_store.saved_tool, run_id, tool_name)
+        if found:
+            self.metrics.count("checkpoint.tool_replayed")
+            return company
+        company = await self._aresearch_tool_shared(tool_name)
+        await _store_call(self.run_store, self.run_store.save_tool, run_id, tool_name, company)
+        return company
+
+    # Async version of _research_tool_shared, background refreshes run as tasks on the same loop
+    async def _aresearch_tool_shared(self, tool_name: str) -> Optional[CompanyInfo]:
+        record = await _store_call(self.knowledge_base, self._known_company, tool_name)
+        if record is not None:
+            if not record.fresh and self._claim_refresh(tool_name):
+                task = asyncio.create_task(self._arefresh(tool_name))
+                # Keep a reference so the task isn't garbage collected before it finishes
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return record.company
+
+        if self.research_memo is not None:
+            company = await self.research_memo.aresearch(tool_name, self._aresearch_tool_coalesced)
+        else:
+            company = await self._aresearch_tool_coalesced(tool_name)
+        await _store_call(self.knowledge_base, self._remember, company)
+        return company
+
+    async def _aresearch_tool_coalesced(self, tool_name: str) -> Optional[CompanyInfo]:
+        company = await self.async_single_flight.do(normalize_tool_name(tool_name), self._aresearch_tool, tool_name)
+        return company.model_copy(deep=True) if company else None
+
+    async def _arefresh(self, tool_name: str) -> None:
+        try:
+            company = await self._aresearch_tool_coalesced(tool_name)
+            await _store_call(self.knowledge_base, self._remember, company)
+        except Exception as e:
+            print(f"Error refreshing {tool_name}: {e}")
+        finally:
+            self._release_refresh(tool_name)
+
+    async def _aresearch_step(self, state: ResearchState) -> Dict[str, Any]:
+        extracted_tools = getattr(state, "extracted_tools", [])
+
+        if not extracted_tools:
+            print("⚠️ No tools extracted to research. Falling back to direct search.")
+            search_results = await self.async_firecrawl.search_companies(state.query, num_results=4)
+            tool_names = self._fallback_tool_names(search_results)
+        else:
+            tool_names = extracted_tools[:self.MAX_RESEARCHED_TOOLS]
+
+        print(f"🧐 Researching specific tools: {', '.join(tool_names)}")
+
+        # The semaphore plays the role of the thread pool size in _research_step
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # gather returns results in the order of tool_names regardless of which finished first
+        results = await asyncio.gather(*[
+            self._aresearch_indexed(i, name, semaphore) for i, name in enumerate(tool_names)
+        ])
+
+        companies = [company for company in results if company]
+        return {"companies": companies}
+
+    async def _aresearch_indexed(self, i: int, tool_name: str, semaphore: asyncio.Semaphore) -> Optional[CompanyInfo]:
+        # One tool failing should not take down the rest of the research
+        try:
+            async with semaphore:
+                company = await self._aresearch_tool_checkpointed(tool_name)
+        except Exception as e:
+            print(f"Error during research of {tool_name}: {e}")
+            return None
+        if company:
+            _stream_writer()(CompanyResearched(index=i, company=company))
+        return company
+
+    async def _apipelined_step(self, state: ResearchState) -> Dict[str, Any]:
+        search_results = await self._aarticles(state.query)
+        messages = await _store_call(self.blobs, self._extraction_messages, state.query, search_results)
+
+        lines = _ToolLineBuffer(self._parse_tool_names)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tool_names: List[str] = []
+        tasks: List[asyncio.Task] = []
+
+        def launch(names: List[str]) -> None:
+            for name in names:
+                if normalize_tool_name(name) in map(normalize_tool_name, tool_names):
+                    continue
+                if len(tool_names) < self.MAX_RESEARCHED_TOOLS:
+                    tasks.append(asyncio.create_task(self._aresearch_indexed(len(tool_names), name, semaphore)))
+                tool_names.append(name)
+
+        try:
+            with self.metrics.span("llm.extract_tools"):
+                async for chunk in self.openai_rate.astream(self.llm.astream, messages):
+                    if chunk.content:
+                        launch(lines.feed(chunk.content))
+            launch(lines.flush())
+        except Exception as e:
+            print(f"Error during tool extraction: {e}")
+
+        print(f"🔧 Extracted tools: {','.join(tool_names[:5])}")
+        _stream_writer()(ToolsExtracted(tools=tool_names))
+        if not tool_names:
+            return {"extracted_tools": [], "search_results": search_results, **await self._aresearch_step(state)}
+
+        print(f"🧐 Researching specific tools: {', '.join(tool_names[:self.MAX_RESEARCHED_TOOLS])}")
+        results = await asyncio.gather(*tasks)
+        return {
+            "extracted_tools": tool_names,
+            "search_results": search_results,
+            "companies": [company for company in results if company],
+        }
+
+    async def _aanalyze_step(self, state: ResearchState) -> Dict[str, Any]:
+        print("Generating recommendations")
+
+        messages = self._recommendation_messages(state)
+
+        writer = _stream_writer()
+        analysis = ""
+        with self.metrics.span("llm.recommend"):
+            async for chunk in self.openai_rate.astream(self.llm.astream, messages):
+                if chunk.content:
+                    analysis += chunk.content
+                    writer(RecommendationToken(text=chunk.content))
+        return {"analysis": analysis}
+
+
     # Function that will run the entire workflow graph
-    def run(self, query: str) -> ResearchState:
+    # With a run store, passing the run_id of an earlier run resumes it and skips the work it already finished
+    def run(self, query: str, run_id: Optional[str] = None) -> ResearchState:
         
         # Create initial state with user query
-        initial_state = ResearchState(query=query)
+        initial_state = self._initial_state(query, run_id)
         
-        # Invoke the workflow with the initial state
-        final_state = self.workflow.invoke(initial_state)
+        # Invoke the workflow with the initial state, recording a trace when metrics are on
+        with self.metrics.trace() as trace:
+            final_state = self.workflow.invoke(initial_state)
         
         # Final state in dictionary form, take all fields and insert into ResearchState object
-        return ResearchState(**final_state)
\ No newline at end of file
+        return self._final_state(final_state, trace)
+
+    # Async version of run, many queries can be awaited concurrently on one event loop
+    async def arun(self, query: str, run_id: Optional[str] = None) -> ResearchState:
+        initial_state = await _store_call(self.run_store, self._initial_state, query, run_id)
+        with self.metrics.trace() as trace:
+            final_state = await self.async_workflow.ainvoke(initial_state)
+        return await _store_call(self.run_store, self._final_state, final_state, trace)
+
+    # Run the workflow and yield events as they happen instead of waiting for the final state
+    # Events: ToolsExtracted, then one CompanyResearched per tool, then RecommendationToken chunks, then RunCompleted
+    def stream(self, query: str, run_id: Optional[str] = None) -> Iterator[WorkflowEvent]:
+        initial_state = self._initial_state(query, run_id)
+        final_state = None
+
+        with self.metrics.trace() as trace:
+            # "custom" carries the events written by the nodes, "values" carries the full state after each node
+            for mode, chunk in self.workflow.stream(
+                initial_state, stream_mode=["custom", "values"]
+            ):
+                if mode == "custom":
+                    yield chunk
+                else:
+                    final_state = chunk
+
+        yield RunCompleted(state=self._final_state(final_state, trace))
+
+    # Async version of stream for callers running inside an event loop
+    async def astream(self, query: str, run_id: Optional[str] = None) -> AsyncIterator[WorkflowEvent]:
+        initial_state = await _store_call(self.run_store, self._initial_state, query, run_id)
+        final_state = None
+
+        with self.metrics.trace() as trace:
+            async for mode, chunk in self.async_workflow.astream(
+                initial_state, stream_mode=["custom", "values"]
+            ):
+                if mode == "custom":
+                    yield chunk
+                else:
+                    final_state = chunk
+
+        yield RunCompleted(state=await _store_call(self.run_store, self._final_state, final_state, trace))
+
+    # Text behind a content reference from the state (a company's content_ref or a search result's),
+    # None when there is no reference or the blob has been evicted
+    def content(self, ref: Optional[str]) -> Optional[str]:
+        return self.blobs.get(ref)
+
+    # Every checkpointed run gets an id, returned on the final state so the caller can resume it
+    def _initial_state(self, query: str, run_id: Optional[str]) -> ResearchState:
+        if self.run_store is not None:
+            run_id = run_id or uuid.uuid4().hex
+            if self.run_store.start(run_id, query):
+                print(f"↩️ Resuming run {run_id}")
+        return ResearchState(query=query, run_id=run_id)
+
+    # Build the ResearchState returned to callers, with the run's trace attached when there is one
+    def _final_state(self, final_state: Dict[str, Any], trace) -> ResearchState:
+        state = ResearchState(**final_state)
+        # The run completed, running the same run_id again starts over instead of replaying this result
+        if self.run_store is not None and state.run_id:
+            self.run_store.delete(state.run_id)
+        if trace is not None:
+            state.metrics = trace.to_dict()
+        return state
@@ -5,7 +5,11 @@ from langchain_mcp_adapters.tools import load_mcp_tools
 # Prebuilt agent framework from langgraph
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
+from memory import ConversationMemory
+from tools import wrap_mcp_tools
+from contextlib import AsyncExitStack
 import asyncio
 import os
 
@@ -26,52 +30,63 @@ server_params = StdioServerParameters(
     args = ["firecrawl-mcp"]
 )
 
+# Number of MCP server processes to keep open, tool calls from one agent step are spread across them
+MCP_SESSION_POOL_SIZE = int(os.getenv("MCP_SESSION_POOL_SIZE", "3"))
+
 # Connect to MCP client
 async def main():
     # Can read from client (get result of agent)
     # Can write to client (using tools)
-    async with stdio_client(server_params) as (read, write):
-        # Connect to client with new session, ability to read and write
-        async with ClientSession(read, write) as session:
+    # Open a small pool of sessions so several tool calls can run at the same time
+    async with AsyncExitStack() as stack:
+        tool_sets = []
+        for _ in range(max(1, MCP_SESSION_POOL_SIZE)):
+            read, write = await stack.enter_async_context(stdio_client(server_params))
+            # Connect to client with new session, ability to read and write
+            session = await stack.enter_async_context(ClientSession(read, write))
             await session.initialize()
-            # Find all tools available in session and use
-            tools = await load_mcp_tools(session)
-            agent = create_react_agent(model, tools)
-            
-            # Prompt for agent
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that can scrape websites, crawl pages, and extract data using Firecrawl tools. Think step by step and use the appropriate tools to help the user."
-                }
-            ]
+            # Find all tools available in session
+            tool_sets.append(await load_mcp_tools(session))
+        
+        # Use the tools through the pool, with read-only results (scrape, search...) cached for the session
+        tools = wrap_mcp_tools(tool_sets)
+        agent = create_react_agent(model, tools)
+        
+        # Prompt for agent, older turns are summarized and large tool outputs digested to keep each request small
+        memory = ConversationMemory(
+            model,
+            system_prompt="You are a helpful assistant that can scrape websites, crawl pages, and extract data using Firecrawl tools. Think step by step and use the appropriate tools to help the user.",
+        )
+        
+        # Get and print all tools from the tools list (* unpacks these values into individual arguments)
+        print("Available tools: ", *[tool.name for tool in tools])
+        print("-" * 60)
+        
+        # Keep communicating with the agent
+        while True:
+            user_input = input("\nYou: ")
+            if user_input == "quit":
+                print("Exiting...")
+                break
             
-            # Get and print all tools from the tools list (* unpacks these values into individual arguments)
-            print("Available tools: ", *[tool.name for tool in tools])
-            print("-" * 60)
+            # Invoke llm after with new user message, limit to 175000 characters
+            user_message = HumanMessage(content=user_input[:175000])
+            messages = memory.messages() + [user_message]
             
-            # Keep communicating with the agent
-            while True:
-                user_input = input("\nYou: ")
-                if user_input == "quit":
-                    print("Exiting...")
-                    break
+            # Call agent
+            # ainvoke is an async invocation, wait for invoke to finish
+            try:
+                # Passing through state of messages to the agent
+                agent_response = await agent.ainvoke({"messages": messages})
+                ai_message = agent_response["messages"][-1].content
+                print("\nAgent:", ai_message)
+                # Remember this turn, including the agent's tool calls and answer
+                await memory.add_turn(user_message, agent_response["messages"][len(messages):])
+            except Exception as e:
+                print("\nError:", str(e))
+                
                 
-                # Invoke llm after with new user message, limit to 175000 characters
-                messages.append({"role": "user", "content": user_input[:175000]})
                 
-                # Call agent
-                # ainvoke is an async invocation, wait for invoke to finish
-                try:
-                    # Passing through state of messages to the agent
-                    agent_response = await agent.ainvoke({"messages": messages})
-                    ai_message = agent_response["messages"][-1].content
-                    print("\nAgent:", ai_message)
-                except Exception as e:
-                    print("\nError:", str(e))
-                    
-                    
-                    
 if __name__ == "__main__":
     asyncio.run(main())
         
\ No newline at end of file
@@ -0,0 +1,124 @@
+from typing import List
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+# Keeps the conversation sent to the agent at a roughly constant size
+# - recent turns are kept as-is while they fit in the token budget
+# - older turns are folded into a running summary by the model
+# - bulky tool outputs (scrapes, crawls) are replaced by short digests once their turn is over
+
+# Rough characters per token, good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a web scraping assistant.
+Update the summary with the new messages below. Keep facts the user may refer back to: URLs, site names,
+extracted data points, decisions and open questions. Drop pleasantries and raw page content.
+Reply with the updated summary only, at most {max_words} words."""
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += len(content) // CHARS_PER_TOKEN + 4
+        # Tool call arguments are sent too
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += len(str(tool_call.get("args", ""))) // CHARS_PER_TOKEN
+    return total
+
+
+def digest_tool_output(message: ToolMessage, max_chars: int) -> ToolMessage:
+    # Keep the start of a long tool result and note how much was dropped, the tool_call_id stays intact
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if len(content) <= max_chars:
+        return message
+    digest = (
+        f"[Digest of {message.name or 'tool'} output, {len(content)} characters originally]\n"
+        f"{content[:max_chars].rstrip()}\n[... rest omitted, call the tool again if the full content is needed]"
+    )
+    return ToolMessage(content=digest, tool_call_id=message.tool_call_id, name=message.name)
+
+
+def _transcript(messages: List[BaseMessage], max_chars: int = 2000) -> str:
+    # Plain-text version of the messages for the summarizer, each message clipped to max_chars
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        content = content[:max_chars]
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {content}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name}: {content}")
+        elif isinstance(message, AIMessage):
+            for tool_call in message.tool_calls or []:
+                lines.append(f"Assistant called {tool_call['name']} with {tool_call['args']}")
+            if content:
+                lines.append(f"Assistant: {content}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Token-budgeted conversation history with a rolling summary of older turns"""
+
+    def __init__(
+        self,
+        model,
+        system_prompt: str,
+        token_budget: int = 6000,
+        tool_digest_chars: int = 1500,
+        summary_words: int = 250,
+    ):
+        self.model = model
+        self.system_prompt = system_prompt
+        # Approximate tokens of history (summary + recent turns) sent with each request
+        self.token_budget = token_budget
+        self.tool_digest_chars = tool_digest_chars
+        self.summary_words = summary_words
+        self.summary = ""
+        # Each turn is the user's message followed by everything the agent added while answering it
+        self.turns: List[List[BaseMessage]] = []
+
+    def messages(self) -> List[BaseMessage]:
+        # History to send with the next user message
+        messages: List[BaseMessage] = [SystemMessage(content=self.system_prompt)]
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"))
+        for turn in self.turns:
+            messages.extend(turn)
+        return messages
+
+    async def add_turn(self, user_message: BaseMessage, agent_messages: List[BaseMessage]) -> None:
+        # Tool outputs were only needed while the agent worked on this turn, keep digests from now on
+        turn = [user_message] + [
+            digest_tool_output(message, self.tool_digest_chars) if isinstance(message, ToolMessage) else message
+            for message in agent_messages
+        ]
+        self.turns.append(turn)
+        await self._compact()
+
+    async def _compact(self) -> None:
+        # Fold the oldest turns into the summary until the history fits, the latest turn is always kept whole
+        overflow: List[BaseMessage] = []
+        while len(self.turns) > 1 and estimate_tokens(self.messages()) > self.token_budget:
+            overflow.extend(self.turns.pop(0))
+        if overflow:
+            self.summary = await self._summarize(overflow)
+
+    async def _summarize(self, messages: List[BaseMessage]) -> str:
+        prompt = [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.summary_words)),
+            HumanMessage(content=f"Current summary:\n{self.summary or '(empty)'}\n\nNew messages:\n{_transcript(messages)}"),
+        ]
+        try:
+            response = await self.model.ainvoke(prompt)
+            return response.content.strip()
+        except Exception as e:
+            # Keep going without the model, a clipped transcript is better than losing the turns entirely
+            print("\nError summarizing conversation:", str(e))
+            clipped = _transcript(messages)[: self.summary_words * 6]
+            return f"{self.summary}\n{clipped}".strip()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from langchain_core.tools import BaseTool, StructuredTool
+
+# Wraps the Firecrawl MCP tools loaded from one or more sessions
+# - results of read-only tools are cached by tool name + canonical arguments (LRU with a TTL)
+# - identical calls made at the same time share one request
+# - calls are spread over a pool of MCP sessions, so tool calls the model makes in one step run side by side
+
+# Tools that only read from the web, safe to answer from the cache
+READ_ONLY_TOOLS = {"firecrawl_scrape", "firecrawl_search", "firecrawl_map", "firecrawl_extract"}
+
+
+def _canonical_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/") or "/", parts.query, ""))
+
+
+def _canonical(value: Any) -> Any:
+    # Same arguments in a different order, case of host names or with a trailing slash hit the same entry
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, str) and value.startswith(("http://", "https://")):
+        return _canonical_url(value)
+    return value
+
+
+def cache_key(tool_name: str, args: Dict[str, Any]) -> str:
+    return f"{tool_name}:{json.dumps(_canonical(args), sort_keys=True, separators=(',', ':'))}"
+
+
+class ToolResultCache:
+    """LRU cache of tool results with a TTL, only used from the event loop"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 15 * 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SessionPool:
+    """Hands out MCP sessions one call at a time, each session has its own copy of the tools"""
+
+    def __init__(self, tool_sets: List[List[BaseTool]]):
+        self._tools: List[Dict[str, BaseTool]] = [{tool.name: tool for tool in tools} for tools in tool_sets]
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for index in range(len(self._tools)):
+            self._idle.put_nowait(index)
+
+    async def call(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        index = await self._idle.get()
+        try:
+            # Call the adapter's coroutine directly so its (content, artifact) result is passed through unchanged
+            return await self._tools[index][tool_name].coroutine(**args)
+        finally:
+            self._idle.put_nowait(index)
+
+
+def wrap_mcp_tools(tool_sets: List[List[BaseTool]], cache: Optional[ToolResultCache] = None) -> List[BaseTool]:
+    # tool_sets holds the tools loaded from each session in the pool, all sessions expose the same tools
+    pool = SessionPool(tool_sets)
+    cache = cache if cache is not None else ToolResultCache()
+    in_flight: Dict[str, asyncio.Task] = {}
+
+    async def call_and_cache(key: str, tool_name: str, kwargs: Dict[str, Any]) -> Any:
+        result = await pool.call(tool_name, kwargs)
+        # Errors are passed to anyone waiting but never cached
+        cache.set(key, result)
+        return result
+
+    def forget(key: str, task: asyncio.Task) -> None:
+        if in_flight.get(key) is task:
+            del in_flight[key]
+        # Retrieve the exception in case every caller was cancelled before the call finished
+        if not task.cancelled():
+            task.exception()
+
+    def make_runner(tool_name: str):
+        async def run(**kwargs):
+            if tool_name not in READ_ONLY_TOOLS:
+                return await pool.call(tool_name, kwargs)
+
+            key = cache_key(tool_name, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+            # Join an identical call that is already running, otherwise start it as its own task
+            # so a caller that is cancelled only stops waiting and the others still get the result
+            task = in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(call_and_cache(key, tool_name, kwargs))
+                in_flight[key] = task
+                task.add_done_callback(lambda done: forget(key, done))
+            return await asyncio.shield(task)
+
+        return run
+
+    wrapped = []
+    for tool in tool_sets[0]:
+        wrapped.append(
+            StructuredTool(
+                name=tool.name,
+                description=tool.description,
+                args_schema=tool.args_schema,
+                coroutine=make_runner(tool.name),
+                response_format=tool.response_format,
+            )
+        )
+    return wrapped